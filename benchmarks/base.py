@@ -0,0 +1,158 @@
+"""
+Shared bootstrap for the benchmark scripts.
+
+Benchmarks run outside the test runner, so they configure a minimal
+in-memory Django project the same way ``runtests.py`` does.
+"""
+import json
+import math
+import os
+import sys
+import time
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+def setup_django(**overrides):
+    from django.conf import settings
+
+    if not settings.configured:
+        options = dict(
+            DEBUG=False,
+            LANGUAGE_CODE='en-us',
+            USE_TZ=True,
+            DATABASES={
+                'default': {
+                    'ENGINE': 'django.db.backends.sqlite3',
+                    'NAME': ':memory:',
+                }
+            },
+            INSTALLED_APPS=[
+                'django.contrib.auth',
+                'django.contrib.contenttypes',
+                'django.contrib.sites',
+                'connected_accounts',
+                'connected_accounts.providers',
+            ],
+            SITE_ID=1,
+            STATIC_URL='/static/',
+            SECRET_KEY='benchmarks',
+        )
+        options.update(overrides)
+        settings.configure(**options)
+
+    try:
+        import django
+        setup = django.setup
+    except AttributeError:
+        pass
+    else:
+        setup()
+
+
+def admin_settings():
+    """Settings overrides for benchmarks that drive the admin views."""
+    return dict(
+        ROOT_URLCONF='benchmarks.urls',
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.admin',
+            'django.contrib.sites',
+            'connected_accounts',
+            'connected_accounts.providers',
+        ],
+        MIDDLEWARE=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        ],
+        MIDDLEWARE_CLASSES=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        ],
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+            'OPTIONS': {
+                'context_processors': [
+                    'django.contrib.auth.context_processors.auth',
+                    'django.contrib.messages.context_processors.messages',
+                ],
+            },
+        }],
+    )
+
+
+def create_superuser():
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0, interactive=False)
+    return User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+
+def timed(func, *args, **kwargs):
+    """Call ``func`` and return ``(result, elapsed_seconds)``."""
+    start = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - start
+
+
+def report(title, rows):
+    sys.stdout.write('\n{0}\n{1}\n'.format(title, '-' * len(title)))
+    for label, value in rows:
+        sys.stdout.write('{0:<40} {1}\n'.format(label, value))
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    index = max(0, int(math.ceil(percent / 100.0 * len(samples))) - 1)
+    return samples[index]
+
+
+def summarize(samples):
+    """Return count, mean, stdev, min, max and p50/p95/p99 of ``samples``."""
+    samples = sorted(samples)
+    count = len(samples)
+    if not count:
+        return {'count': 0}
+    mean = sum(samples) / float(count)
+    variance = sum((value - mean) ** 2 for value in samples) / (count - 1) if count > 1 else 0.0
+    return {
+        'count': count,
+        'mean': mean,
+        'stdev': math.sqrt(variance),
+        'min': samples[0],
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'max': samples[-1],
+    }
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, '{0}.json'.format(name))
+
+
+def load_baseline(name):
+    """Return the saved results for benchmark ``name``, or ``None``."""
+    try:
+        with open(baseline_path(name)) as fp:
+            return json.load(fp)
+    except (IOError, OSError):
+        return None
+
+
+def save_baseline(name, results):
+    if not os.path.isdir(BASELINE_DIR):
+        os.makedirs(BASELINE_DIR)
+    with open(baseline_path(name), 'w') as fp:
+        json.dump(results, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+    sys.stdout.write('\nSaved baseline to {0}\n'.format(baseline_path(name)))
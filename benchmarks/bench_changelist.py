@@ -0,0 +1,66 @@
+"""
+Measure how the account changelist scales with the number of rows.
+
+Usage::
+
+    python -m benchmarks.bench_changelist [rows ...]
+
+For each row count the changelist is rendered with every account on a
+single page, and the render time and number of queries are reported.
+"""
+import sys
+
+from benchmarks.base import admin_settings, create_superuser, report, setup_django, timed
+
+PROVIDERS = (
+    ('twitter', {'screen_name': 'user{0}', 'name': 'User {0}',
+                 'profile_image_url': 'https://example.com/{0}_normal.png'}),
+    ('facebook', {'name': 'User {0}', 'link': 'https://facebook.com/{0}'}),
+    ('google', {'name': 'User {0}', 'picture': 'https://example.com/{0}.png'}),
+)
+
+
+def create_accounts(user, count):
+    from connected_accounts.models import Account
+
+    Account.objects.all().delete()
+    accounts = []
+    for i in range(count):
+        provider, extra_data = PROVIDERS[i % len(PROVIDERS)]
+        accounts.append(Account(
+            user=user, provider=provider, uid=str(i), raw_token='x' * 512,
+            oauth_token='token', oauth_token_secret='secret',
+            extra_data=dict((key, value.format(i)) for key, value in extra_data.items())))
+    Account.objects.bulk_create(accounts)
+
+
+def main(*row_counts):
+    setup_django(**admin_settings())
+
+    from django.contrib import admin
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from connected_accounts.models import Account
+
+    user = create_superuser()
+    client = Client()
+    client.force_login(user)
+
+    model_admin = admin.site._registry[Account]
+    rows = []
+    for count in row_counts or (10, 100, 500):
+        create_accounts(user, count)
+        model_admin.list_per_page = count
+        client.get('/admin/connected_accounts/account/')  # warm up
+        with CaptureQueriesContext(connection) as queries:
+            response, elapsed = timed(client.get, '/admin/connected_accounts/account/')
+        assert response.status_code == 200
+        rows.append(('{0} rows'.format(count), '{0:8.1f}ms  {1:.3f}ms/row  {2} queries'.format(
+            elapsed * 1000, elapsed * 1000 / count, len(queries))))
+
+    report('Account changelist render time', rows)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
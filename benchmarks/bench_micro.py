@@ -0,0 +1,195 @@
+"""
+Microbenchmarks for the CPU-bound parts of the OAuth flow.
+
+Usage::
+
+    python -m benchmarks.bench_micro [--repeat N] [--save] [--tolerance PERCENT] [name ...]
+
+Each case is run in loops long enough to time reliably, ``--repeat``
+times over; the per-call mean, standard deviation, minimum and median
+are reported. Results are compared with ``benchmarks/baselines/micro.json``:
+a case counts as changed when its median moved by more than
+``--tolerance`` percent and by more than the noise of either run.
+``--save`` stores the cases that ran in the baseline. Only cases whose
+name contains one of the given ``name`` arguments are run.
+"""
+import argparse
+import sys
+import timeit
+
+from benchmarks.base import load_baseline, report, save_baseline, setup_django, summarize
+
+BASELINE = 'micro'
+
+OAUTH1_TOKEN = 'oauth_token=token&oauth_token_secret=secret&user_id=1&screen_name=user'
+OAUTH2_JSON_TOKEN = '{"access_token": "token", "refresh_token": "refresh", "expires_in": 3600}'
+OAUTH2_QS_TOKEN = 'access_token=token&refresh_token=refresh&expires=3600'
+
+
+class FakeResponse(object):
+    status_code = 200
+    headers = {}
+
+
+class SigningSession(object):
+    """Prepares (and so signs) requests instead of sending them."""
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, **kwargs):
+        from requests import Request
+
+        Request(method, url, params=params, data=data, headers=headers, auth=auth).prepare()
+        return FakeResponse()
+
+
+def get_request():
+    from django.test import RequestFactory
+
+    request = RequestFactory().get('/admin/connected_accounts/account/login/')
+    request.session = {}
+    return request
+
+
+def get_cases():
+    """Return ``[(name, func)]``, each ``func`` running the code under test once."""
+    from django.contrib.auth.models import User
+    from connected_accounts.models import Account
+    from connected_accounts.provider_pool import providers
+
+    twitter = providers.by_id('twitter')
+    google = providers.by_id('google')
+    facebook = providers.by_id('facebook')
+    for provider in (twitter, google, facebook):
+        provider.consumer_key = 'key'
+        provider.consumer_secret = 'secret'
+        provider.get_session = lambda: SigningSession()
+    twitter.get_request_token = lambda request, callback: OAUTH1_TOKEN
+
+    request = get_request()
+    callback = '/admin/connected_accounts/account/callback/google/'
+    user = User(username='user')
+    accounts = [
+        Account(user=user, provider='twitter', uid='1', oauth_token='token',
+                oauth_token_secret='secret', raw_token=OAUTH1_TOKEN,
+                extra_data={'screen_name': 'user', 'name': 'User',
+                            'profile_image_url': 'https://example.com/1_normal.png'}),
+        Account(user=user, provider='google', uid='1', oauth_token='token',
+                oauth_token_secret='refresh', raw_token=OAUTH2_JSON_TOKEN,
+                extra_data={'name': 'User', 'email': 'user@example.com',
+                            'picture': 'https://example.com/1.png'}),
+    ]
+
+    return [
+        ('oauth1.parse_raw_token', lambda: twitter.parse_raw_token(OAUTH1_TOKEN)),
+        ('oauth2.parse_raw_token[json]', lambda: google.parse_raw_token(OAUTH2_JSON_TOKEN)),
+        ('oauth2.parse_raw_token[qs]', lambda: facebook.parse_raw_token(OAUTH2_QS_TOKEN)),
+        ('oauth1.get_redirect_args', lambda: twitter.get_redirect_args(request, callback)),
+        ('oauth1.get_redirect_url', lambda: twitter.get_redirect_url(request, callback)),
+        ('oauth2.get_redirect_args', lambda: google.get_redirect_args(request, callback)),
+        ('oauth2.get_redirect_url', lambda: google.get_redirect_url(request, callback)),
+        ('oauth1.request[signed]', lambda: twitter.request(
+            'get', 'https://api.example.com/1.1/account/verify_credentials.json',
+            token=OAUTH1_TOKEN)),
+        ('oauth2.request', lambda: google.request(
+            'get', 'https://api.example.com/oauth2/v1/userinfo', token=OAUTH2_JSON_TOKEN)),
+        ('account.get_common_data[oauth1]', accounts[0].get_common_data),
+        ('account.get_common_data[oauth2]', accounts[1].get_common_data),
+        ('account.to_json[oauth1]', accounts[0].to_json),
+        ('account.to_json[oauth2]', accounts[1].to_json),
+    ]
+
+
+def get_loops(func, target=0.02):
+    """Find how many calls take at least ``target`` seconds."""
+    loops = 1
+    while True:
+        elapsed = timeit.Timer(func).timeit(loops)
+        if elapsed >= target:
+            return loops
+        loops *= 10 if elapsed < target / 10 else 2
+
+
+def run_case(func, repeat):
+    """Return the per-call timing of ``repeat`` samples."""
+    func()  # warm up
+    loops = get_loops(func)
+    samples = [elapsed / loops for elapsed in timeit.Timer(func).repeat(repeat, loops)]
+    summary = summarize(samples)
+    summary['loops'] = loops
+    return summary
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds >= 1 / scale:
+            return '{0:7.2f}{1}'.format(seconds * scale, unit)
+    return '{0:7.0f}ns'.format(seconds * 1e9)
+
+
+def format_summary(summary):
+    return '{0} +- {1}  min {2}  median {3}'.format(
+        format_time(summary['mean']), format_time(summary['stdev']),
+        format_time(summary['min']), format_time(summary['p50']))
+
+
+def compare(results, baseline, tolerance):
+    """Return ``(name, change)`` rows and whether any case got slower."""
+    rows = []
+    slower = False
+    for name, summary in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            rows.append((name, 'new'))
+            continue
+        change = (summary['p50'] - previous['p50']) / previous['p50'] * 100
+        noise = max(summary['stdev'], previous['stdev'])
+        significant = (abs(change) > tolerance and
+                       abs(summary['p50'] - previous['p50']) > noise)
+        verdict = ''
+        if significant:
+            verdict = 'slower' if change > 0 else 'faster'
+            slower = slower or change > 0
+        rows.append((name, '{0} -> {1}  {2:+6.1f}%  {3}'.format(
+            format_time(previous['p50']), format_time(summary['p50']), change, verdict).rstrip()))
+    return rows, slower
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('names', nargs='*', help='only run cases containing one of these')
+    parser.add_argument('--repeat', type=int, default=15, help='samples per case')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=10,
+                        help='median change to report against the baseline, in percent')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_django(ALLOWED_HOSTS=['testserver'])
+
+    results = {}
+    rows = []
+    for name, func in get_cases():
+        if args.names and not any(pattern in name for pattern in args.names):
+            continue
+        results[name] = run_case(func, args.repeat)
+        rows.append((name, format_summary(results[name])))
+    report('Per call, {0} samples'.format(args.repeat), rows)
+
+    if args.save:
+        baseline = load_baseline(BASELINE) or {}
+        baseline.update(results)
+        save_baseline(BASELINE, baseline)
+        return 0
+
+    baseline = load_baseline(BASELINE)
+    if baseline is None:
+        sys.stdout.write('\nNo baseline saved yet, run with --save to create one.\n')
+        return 0
+    rows, slower = compare(results, baseline, args.tolerance)
+    report('Median against the baseline', rows)
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
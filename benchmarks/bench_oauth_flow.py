@@ -0,0 +1,311 @@
+"""
+Drive the OAuth login flow end to end against a local stub provider.
+
+Usage::
+
+    python -m benchmarks.bench_oauth_flow [--logins N] [--threads N]
+        [--provider ID ...] [--save] [--tolerance PERCENT]
+
+Every bundled provider is pointed at a threaded stub server that issues
+request tokens (OAuth 1.0a), exchanges codes and refresh tokens (OAuth 2)
+and serves profiles. For each provider ``OAuthRedirect`` and
+``OAuthCallback`` are requested through the Django test client from
+several threads at once, then the stored OAuth 2 tokens are refreshed.
+Throughput, latency percentiles and queries per request are reported and
+compared with ``benchmarks/baselines/oauth_flow.json``; ``--save``
+replaces that baseline with the current run.
+"""
+import argparse
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from benchmarks.base import (
+    admin_settings, create_superuser, load_baseline, report, save_baseline, setup_django,
+    summarize, timed)
+from benchmarks.stub_server import StubServer, form_response, json_response
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from urlparse import parse_qs, urlparse
+
+BASELINE = 'oauth_flow'
+
+uids = itertools.count(1)
+
+
+def request_token_response(handler, body):
+    """Issue a fresh request token, as each one can only be used once."""
+    token = 'request{0}'.format(next(uids))
+    return form_response({
+        'oauth_token': token, 'oauth_token_secret': 'secret',
+        'oauth_callback_confirmed': 'true'})(handler, body)
+
+
+def profile_response(build):
+    """Serve a profile with a fresh uid, so every login creates an account."""
+    def route(handler, body):
+        return json_response(build(str(next(uids))))(handler, body)
+    return route
+
+
+# provider id -> (access token route, profile route)
+ROUTES = {
+    'twitter': (
+        form_response({'oauth_token': 'access', 'oauth_token_secret': 'secret'}),
+        profile_response(lambda uid: {'id': uid, 'screen_name': 'user' + uid, 'name': 'User'})),
+    'facebook': (
+        form_response({'access_token': 'access', 'expires_in': 3600}),
+        profile_response(lambda uid: {'id': uid, 'name': 'User', 'email': uid + '@example.com'})),
+    'google': (
+        json_response({'access_token': 'access', 'refresh_token': 'refresh', 'expires_in': 3600}),
+        profile_response(lambda uid: {'id': uid, 'name': 'User', 'email': uid + '@example.com'})),
+    'instagram': (
+        json_response({'access_token': 'access', 'refresh_token': 'refresh'}),
+        profile_response(lambda uid: {'data': {'id': uid, 'username': 'user' + uid}})),
+    'bitly': (
+        json_response({'access_token': 'access', 'refresh_token': 'refresh'}),
+        profile_response(lambda uid: {'data': {'login': 'user' + uid}})),
+    'mailchimp': (
+        json_response({'access_token': 'access', 'refresh_token': 'refresh'}),
+        profile_response(lambda uid: {'user_id': uid, 'login': {'login_name': 'user' + uid}})),
+    'disqus': (
+        json_response({'access_token': 'access', 'refresh_token': 'refresh', 'expires_in': 3600}),
+        profile_response(lambda uid: {'response': {'id': uid, 'username': 'user' + uid}})),
+}
+
+
+def point_at(server, provider):
+    """Send the provider's calls to the stub server instead of the real API."""
+    provider.consumer_key = 'key'
+    provider.consumer_secret = 'secret'
+    provider.authorization_url = '{0}/{1}/authorize'.format(server.url, provider.id)
+    provider.access_token_url = '{0}/{1}/access_token'.format(server.url, provider.id)
+    provider.profile_url = '{0}/{1}/profile'.format(server.url, provider.id)
+    if hasattr(provider, 'request_token_url'):
+        provider.request_token_url = '{0}/{1}/request_token'.format(server.url, provider.id)
+
+
+def get_routes(provider_ids):
+    routes = {}
+    for provider_id in provider_ids:
+        access_token, profile = ROUTES[provider_id]
+        routes['/{0}/request_token'.format(provider_id)] = request_token_response
+        routes['/{0}/access_token'.format(provider_id)] = access_token
+        routes['/{0}/profile'.format(provider_id)] = profile
+    return routes
+
+
+def get_callback_query(location):
+    """Answer the authorization redirect the way the provider would."""
+    args = parse_qs(urlparse(location).query)
+    if 'oauth_token' in args:
+        return {'oauth_token': args['oauth_token'][0], 'oauth_verifier': 'verifier'}
+    return {'code': 'code', 'state': args['state'][0]}
+
+
+def run_threads(target, items, threads):
+    """Split ``items`` across ``threads`` workers; returns each worker's results."""
+    from django.db import connection
+
+    results = [[] for _ in range(threads)]
+    errors = []
+
+    def worker(index):
+        try:
+            for item in items[index::threads]:
+                results[index].append(target(item))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(i, )) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return [result for chunk in results for result in chunk]
+
+
+def begin_immediate(sender, connection, **kwargs):
+    """
+    Take SQLite's write lock when a transaction starts, so concurrent
+    ``update_or_create`` calls queue on the busy timeout instead of
+    failing to upgrade a read lock.
+    """
+    if connection.vendor == 'sqlite':
+        connection._start_transaction_under_autocommit = \
+            lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+
+
+def measure(func, *args):
+    """Return ``(result, elapsed, queries)`` for one call on this thread's connection."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        result, elapsed = timed(func, *args)
+    return result, elapsed, len(queries)
+
+
+def login_flow(user, provider_id):
+    from django.test import Client
+
+    local = threading.local()
+    prefix = '/admin/connected_accounts/account'
+
+    def login(_):
+        # One client, and so one session, per thread.
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+            client.force_login(user)
+        response, redirect_time, redirect_queries = measure(
+            client.get, '{0}/login/{1}/'.format(prefix, provider_id))
+        assert response.status_code == 302, response.status_code
+        query = get_callback_query(response['Location'])
+        response, callback_time, callback_queries = measure(
+            client.get, '{0}/callback/{1}/'.format(prefix, provider_id), query)
+        assert response.status_code == 302, response.status_code
+        return redirect_time, redirect_queries, callback_time, callback_queries
+    return login
+
+
+def refresh(account):
+    _, elapsed, queries = measure(account.refresh_access_token)
+    return elapsed, queries
+
+
+def summarize_phase(results, elapsed):
+    timings = [result[0] for result in results]
+    queries = [result[1] for result in results]
+    summary = summarize(timings)
+    summary.update(throughput=len(results) / elapsed, queries=sum(queries) / float(len(queries)))
+    return summary
+
+
+def benchmark_provider(provider, user, logins, threads):
+    from connected_accounts.models import Account
+    from connected_accounts.providers.base import OAuth2Provider
+
+    login = login_flow(user, provider.id)
+    run_threads(login, list(range(threads)), threads)  # warm up
+    before = Account.objects.filter(provider=provider.id).count()
+    results, elapsed = timed(run_threads, login, list(range(logins)), threads)
+    # Failed logins redirect to the changelist too, so count the accounts.
+    created = Account.objects.filter(provider=provider.id).count() - before
+    assert created == logins, '{0} of {1} logins failed'.format(logins - created, logins)
+    phases = {
+        'redirect': summarize_phase([result[:2] for result in results], elapsed),
+        'callback': summarize_phase([result[2:] for result in results], elapsed),
+    }
+    if isinstance(provider, OAuth2Provider):
+        accounts = list(Account.objects.filter(provider=provider.id)[:logins])
+        results, elapsed = timed(run_threads, refresh, accounts, threads)
+        phases['refresh'] = summarize_phase(results, elapsed)
+    return phases
+
+
+def format_phase(summary):
+    return '{0:>6.0f}/s  p50 {1:6.2f}ms  p95 {2:6.2f}ms  p99 {3:6.2f}ms  {4:4.1f} queries'.format(
+        summary['throughput'], summary['p50'] * 1000, summary['p95'] * 1000,
+        summary['p99'] * 1000, summary['queries'])
+
+
+def compare(results, baseline, tolerance):
+    """Return the phases that got slower than ``tolerance`` allows, or ran more queries."""
+    regressions = []
+    for provider_id, phases in sorted(results.items()):
+        for phase, summary in sorted(phases.items()):
+            previous = baseline.get(provider_id, {}).get(phase)
+            if previous is None:
+                continue
+            label = '{0} {1}'.format(provider_id, phase)
+            # The median, as lock waits on SQLite make the tail noisy.
+            if summary['p50'] > previous['p50'] * (1 + tolerance / 100.0):
+                regressions.append((label, 'p50 {0:.2f}ms -> {1:.2f}ms'.format(
+                    previous['p50'] * 1000, summary['p50'] * 1000)))
+            if summary['queries'] > previous['queries']:
+                regressions.append((label, 'queries {0:.1f} -> {1:.1f}'.format(
+                    previous['queries'], summary['queries'])))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200, help='logins per provider')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--provider', action='append', dest='providers', choices=sorted(ROUTES))
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=25,
+                        help='allowed median slowdown against the baseline, in percent')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    provider_ids = args.providers or sorted(ROUTES)
+
+    # Threads need a database they can share, which in-memory SQLite is not.
+    tmpdir = tempfile.mkdtemp()
+    options = admin_settings()
+    options.update(
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tmpdir, 'db.sqlite3'),
+            'OPTIONS': {'timeout': 30},
+        }},
+        SESSION_ENGINE='django.contrib.sessions.backends.cache',
+        ALLOWED_HOSTS=['testserver'],
+    )
+    setup_django(**options)
+
+    from django.db.backends.signals import connection_created
+    connection_created.connect(begin_immediate)
+
+    from connected_accounts.provider_pool import providers
+    from connected_accounts.session_pool import sessions
+
+    server = StubServer(get_routes(provider_ids)).start()
+    results = {}
+    try:
+        user = create_superuser()
+        for provider_id in provider_ids:
+            provider = providers.by_id(provider_id)
+            point_at(server, provider)
+            results[provider_id] = benchmark_provider(provider, user, args.logins, args.threads)
+            report('{0}: {1} logins across {2} threads'.format(
+                provider_id, args.logins, args.threads),
+                [(phase, format_phase(summary)) for phase, summary in sorted(
+                    results[provider_id].items())])
+    finally:
+        server.stop()
+        sessions.close()
+        shutil.rmtree(tmpdir)
+
+    if args.save:
+        save_baseline(BASELINE, results)
+        return 0
+
+    baseline = load_baseline(BASELINE)
+    if baseline is None:
+        sys.stdout.write('\nNo baseline saved yet, run with --save to create one.\n')
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        report('Regressions against the baseline', regressions)
+        return 1
+    sys.stdout.write('\nNo regressions against the baseline.\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
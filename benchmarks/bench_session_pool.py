@@ -0,0 +1,58 @@
+"""
+Compare one-shot ``requests`` calls with the pooled provider sessions.
+
+Usage::
+
+    python -m benchmarks.bench_session_pool [calls] [threads]
+
+Every call hits a local stub server; the number of TCP connections the
+server accepted shows how many handshakes each strategy paid for.
+"""
+import sys
+import threading
+
+from benchmarks.base import report, setup_django, timed
+from benchmarks.stub_server import StubServer, json_response
+
+
+def run(call, calls, threads):
+    per_thread = calls // threads
+
+    def worker():
+        for _ in range(per_thread):
+            call().raise_for_status()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+def main(calls=500, threads=4):
+    setup_django()
+
+    import requests
+    from connected_accounts.provider_pool import providers
+    from connected_accounts.session_pool import sessions
+
+    provider = providers.by_id('facebook')
+    rows = []
+    for label, make_call in (
+        ('requests.api.request', lambda url: lambda: requests.get(url)),
+        ('provider.request (pooled)', lambda url: lambda: provider.request('get', url)),
+    ):
+        server = StubServer({'/me': json_response({'id': '1'})}).start()
+        try:
+            _, elapsed = timed(run, make_call(server.url + '/me'), calls, threads)
+        finally:
+            server.stop()
+            sessions.close()
+        rows.append((label, '{0:.3f}s  {1:>5.0f} req/s  {2} connections'.format(
+            elapsed, calls / elapsed, server.connections)))
+
+    report('{0} calls across {1} threads'.format(calls, threads), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,95 @@
+"""
+A tiny threaded HTTP/1.1 server used as a stand-in for OAuth providers.
+
+The server keeps connections alive and counts how many TCP connections
+were accepted, which is what connection pooling is meant to reduce.
+"""
+import json
+import threading
+
+try:
+    from urllib.parse import urlencode
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from urllib import urlencode
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_any(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        route = self.server.routes.get(self.path.split('?', 1)[0])
+        if route is None:
+            status, content_type, content = 404, 'text/plain', 'Not found'
+        else:
+            status, content_type, content = route(self, body)
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = handle_any
+    do_POST = handle_any
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, routes=None, host='127.0.0.1', port=0):
+        HTTPServer.__init__(self, (host, port), StubRequestHandler)
+        self.routes = routes or {}
+        self.connections = 0
+        self.connections_lock = threading.Lock()
+        self.thread = None
+
+    def count_connection(self):
+        with self.connections_lock:
+            self.connections += 1
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self.server_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def json_response(data, status=200):
+    def route(handler, body):
+        return status, 'application/json', json.dumps(data)
+    return route
+
+
+def form_response(data, status=200):
+    def route(handler, body):
+        return status, 'application/x-www-form-urlencoded', urlencode(data)
+    return route
@@ -1,23 +1,36 @@
+import json
 from functools import update_wrapper
 
 from django.contrib import admin, messages
 from django.contrib.admin import helpers
 from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
-from django.core.exceptions import PermissionDenied
-from django.core.urlresolvers import reverse
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Q
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, HttpResponseRedirect)
 from django.shortcuts import redirect
-from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
 from django.utils.encoding import force_text
+from django.utils.html import format_html
+from django.utils.http import parse_etags, quote_etag
 from django.utils.translation import ugettext_lazy as _
 
+from .cache import get_account_json
+from .conf import settings
 from .fields import AccountField
 from .forms import AccountCreationForm
 from .models import Account
 from .provider_pool import providers
 from .views import OAuthCallback, OAuthRedirect
-from .widgets import AccountRawIdWidget
+from .widgets import AccountRawIdWidget, prefetch_account_widgets
+
+try:
+    from django.urls import reverse
+except ImportError:  # pragma: no cover
+    # Django < 1.10
+    from django.core.urlresolvers import reverse
 
 try:
     from urlparse import parse_qsl
@@ -40,24 +53,44 @@ providers.discover_providers()
 PRESERVED_FILTERS_SESSION_KEY = '_preserved_filters'
 
 
+def etag_matches(if_none_match, etag):
+    """Return whether an ``If-None-Match`` header matches ``etag``."""
+    if not if_none_match:
+        return False
+    # Django < 1.11 returns the etags unquoted.
+    etags = [e[2:] if e.startswith('W/') else e for e in parse_etags(if_none_match)]
+    return '*' in etags or etag in etags or quote_etag(etag) in etags
+
+
+class AccountChangeList(ChangeList):
+
+    def get_queryset(self, request):
+        # Tokens are never shown in the changelist; don't load them.
+        return super(AccountChangeList, self).get_queryset(request).defer(
+            'raw_token', 'oauth_token', 'oauth_token_secret')
+
+
 class AccountAdmin(admin.ModelAdmin):
     actions = None
     change_form_template = 'admin/connected_accounts/account/change_form.html'
     readonly_fields = ('avatar', 'uid', 'provider', 'profile_url',
-                       'oauth_token', 'oauth_token_secret', 'user',
-                       'expires_at', 'date_added', 'last_login', )
+                       'email', 'username', 'name',
+                       'oauth_token', 'oauth_token_secret', 'scope', 'user',
+                       'expires_at', 'date_added', 'last_login', 'synced_at', )
     list_display = ('avatar', '__str__', 'provider', )
     list_display_links = ('__str__', )
+    list_select_related = ('user', )
+    search_fields = ('=uid', '=email', '=username', '^name', )
 
     fieldsets = (
         (None, {
-            'fields': ('avatar', 'provider', 'uid', 'profile_url', )
+            'fields': ('avatar', 'provider', 'uid', 'profile_url', 'email', 'username', 'name', )
         }),
         (None, {
-            'fields': ('oauth_token', 'oauth_token_secret', )
+            'fields': ('oauth_token', 'oauth_token_secret', 'scope', )
         }),
         (None, {
-            'fields': ('date_added', 'last_login', 'expires_at', 'user', )
+            'fields': ('date_added', 'last_login', 'synced_at', 'expires_at', 'user', )
         }),
     )
 
@@ -68,6 +101,24 @@ class AccountAdmin(admin.ModelAdmin):
             )
         }
 
+    def get_changelist(self, request, **kwargs):
+        return AccountChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match the uid, email and username exactly and names by prefix, with
+        lookups the column indexes can serve. Email and username are stored
+        lowercased, so the term is lowercased for them rather than compared
+        with ``UPPER()`` on both sides.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        lowered = search_term.lower()
+        return queryset.filter(
+            Q(uid=search_term) | Q(email=lowered) | Q(username=lowered) |
+            Q(name__startswith=search_term)), False
+
     def get_urls(self):
         """
         Add the export view to urls.
@@ -75,19 +126,28 @@ class AccountAdmin(admin.ModelAdmin):
         urls = super(AccountAdmin, self).get_urls()
         from django.conf.urls import url
 
-        def wrap(view):
+        def wrap(view, cacheable=False):
             def wrapper(*args, **kwargs):
-                return self.admin_site.admin_view(view)(*args, **kwargs)
+                return self.admin_site.admin_view(view, cacheable)(*args, **kwargs)
             return update_wrapper(wrapper, view)
 
         info = self.opts.app_label, self.opts.model_name
 
+        if settings.CONNECTED_ACCOUNTS_ASYNC_VIEWS:
+            from .async_views import AsyncOAuthCallback, AsyncOAuthRedirect, async_admin_view
+            redirect_view = async_admin_view(self.admin_site, AsyncOAuthRedirect.as_view())
+            callback_view = async_admin_view(self.admin_site, AsyncOAuthCallback.as_view())
+        else:
+            redirect_view = wrap(OAuthRedirect.as_view())
+            callback_view = wrap(OAuthCallback.as_view())
+
         extra_urls = [
             url(r'^login/(?P<provider>(\w|-)+)/$',
-                wrap(OAuthRedirect.as_view()), name='%s_%s_login' % info),
+                redirect_view, name='%s_%s_login' % info),
             url(r'^callback/(?P<provider>(\w|-)+)/$',
-                wrap(OAuthCallback.as_view()), name='%s_%s_callback' % info),
-            url(r'^(.+)/json/$', wrap(self.json_view), name='%s_%s_json' % info),
+                callback_view, name='%s_%s_callback' % info),
+            url(r'^json/$', wrap(self.json_batch_view), name='%s_%s_json_batch' % info),
+            url(r'^(.+)/json/$', wrap(self.json_view, cacheable=True), name='%s_%s_json' % info),
         ]
         return extra_urls + urls
 
@@ -137,7 +197,28 @@ class AccountAdmin(admin.ModelAdmin):
 
     def json_view(self, request, object_id):
         obj = self.get_object(request, unquote(object_id))
-        return HttpResponse(content=obj.to_json(),  content_type='application/json')
+        if obj is None:
+            raise Http404
+        content, etag = get_account_json(obj)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content=content, content_type='application/json')
+        response['ETag'] = quote_etag(etag)
+        # Let browsers keep the response but revalidate it on every use.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def json_batch_view(self, request):
+        """Return the JSON data of several accounts, given as ``?ids=1,2,3``."""
+        ids = [pk for pk in request.GET.get('ids', '').split(',') if pk]
+        try:
+            accounts = self.get_queryset(request).in_bulk(ids)
+        except (ValueError, ValidationError):
+            return HttpResponseBadRequest()
+        data = dict((force_text(pk), json.loads(get_account_json(account)[0]))
+                    for pk, account in accounts.items())
+        return HttpResponse(content=json.dumps(data), content_type='application/json')
 
     def response_change(self, request, obj):
         opts = self.model._meta
@@ -167,10 +248,9 @@ class AccountAdmin(admin.ModelAdmin):
         return super(AccountAdmin, self).response_change(request, obj)
 
     def avatar(self, obj):
-        return render_to_string(
-            'admin/connected_accounts/account/includes/changelist_avatar.html', {
-                'avatar_url': obj.get_avatar_url(),
-            })
+        avatar_url = obj.get_avatar_url() or \
+            settings.STATIC_URL + 'img/connected_accounts/icon-user-default.jpg'
+        return format_html('<img class="avatar thumbnail" src="{0}" alt="" />', avatar_url)
     avatar.allow_tags = True
     avatar.short_description = _('Avatar')
 
@@ -192,8 +272,17 @@ class ConnectedAccountAdminMixin(object):
         db = kwargs.get('using')
         if isinstance(db_field, AccountField):
             self.raw_id_fields = self.raw_id_fields + (db_field.name, )
-            kwargs['widget'] = AccountRawIdWidget(
-                db_field.rel, self.admin_site, using=db)
+            # Django < 1.9 only has ``db_field.rel``.
+            rel = getattr(db_field, 'remote_field', None) or db_field.rel
+            kwargs['widget'] = AccountRawIdWidget(rel, self.admin_site, using=db)
             return db_field.formfield(**kwargs)
         return super(ConnectedAccountAdminMixin, self).formfield_for_foreignkey(
             db_field, request, **kwargs)
+
+    def render_change_form(self, request, context, *args, **kwargs):
+        forms = [context['adminform'].form]
+        for inline_admin_formset in context.get('inline_admin_formsets', []):
+            forms.extend(inline_admin_formset.formset.forms)
+        prefetch_account_widgets(forms)
+        return super(ConnectedAccountAdminMixin, self).render_change_form(
+            request, context, *args, **kwargs)
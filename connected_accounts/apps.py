@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 
 
 class ConnectedAccountsConfig(AppConfig):
     name = 'connected_accounts'
     verbose_name = _('Connected Accounts')
+
+    def ready(self):
+        from .cache import invalidate_account_json
+
+        account = self.get_model('Account')
+        post_save.connect(invalidate_account_json, sender=account)
+        post_delete.connect(invalidate_account_json, sender=account)
@@ -0,0 +1,112 @@
+"""
+Async versions of the OAuth views for ASGI deployments.
+
+Provider calls are awaited instead of blocking a worker thread; database
+and session work runs through ``sync_to_async``. Requires Python 3.5+,
+Django 3.1+ (async views) and httpx.
+"""
+import logging
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import add_never_cache_headers
+
+from .instrumentation import timer
+from .utils import get_scope_kwargs
+from .views import OAuthCallback, OAuthRedirect
+
+logger = logging.getLogger('connected_accounts')
+
+
+def load_request(request):
+    """
+    Touch the lazy session and user so they are fetched here, in a worker
+    thread, rather than from inside the event loop.
+    """
+    request.session.keys()
+    getattr(request.user, 'pk', None)
+
+
+def async_admin_view(admin_site, view):
+    """Async counterpart of ``AdminSite.admin_view`` for the OAuth views."""
+
+    async def inner(request, *args, **kwargs):
+        if not await sync_to_async(admin_site.has_permission)(request):
+            return redirect_to_login(
+                request.get_full_path(), reverse('admin:login', current_app=admin_site.name))
+        response = await view(request, *args, **kwargs)
+        add_never_cache_headers(response)
+        return response
+    return update_wrapper(inner, view)
+
+
+class AsyncOAuthRedirect(OAuthRedirect):
+    """Redirect user to OAuth provider to enable access."""
+
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        await sync_to_async(load_request)(request)
+        url = await self.aget_redirect_url(**kwargs)
+        return HttpResponseRedirect(url)
+
+    async def head(self, request, *args, **kwargs):
+        return await self.get(request, *args, **kwargs)
+
+    async def aget_redirect_url(self, **kwargs):
+        """Build redirect url for a given provider."""
+        provider_id = kwargs.get('provider', '')
+        provider = self.get_provider(provider_id)
+        if not provider:
+            raise Http404('Unknown OAuth provider.')
+        callback = self.get_callback_url(provider)
+        params = self.get_additional_parameters(provider)
+        granted_scope = await sync_to_async(self.get_granted_scope)(provider)
+        return await provider.aget_redirect_url(
+            self.request, callback=callback, parameters=params,
+            **get_scope_kwargs(granted_scope))
+
+
+class AsyncOAuthCallback(OAuthCallback):
+    """Base OAuth callback view."""
+
+    async def get(self, request, *args, **kwargs):
+        name = kwargs.get('provider', '')
+        provider = self.get_provider(name)
+        if not provider:
+            raise Http404('Unknown OAuth provider.')
+
+        await sync_to_async(load_request)(request)
+
+        callback = self.get_callback_url(provider)
+        # Fetch access token
+        with timer('callback_phase', provider=provider.id, phase='token_exchange'):
+            raw_token = await provider.aget_access_token(self.request, callback=callback)
+        if raw_token is None:
+            return self.handle_login_failure(provider, 'Could not retrieve token.')
+
+        # Fetch profile info
+        with timer('callback_phase', provider=provider.id, phase='profile_fetch'):
+            profile_data = await provider.aget_profile_data(raw_token)
+
+        if profile_data is None:
+            return self.handle_login_failure(provider, 'Could not retrieve profile.')
+
+        with timer('callback_phase', provider=provider.id, phase='parse'):
+            identifier = provider.extract_uid(profile_data)
+            if identifier is not None:
+                account_defaults = await sync_to_async(self.get_account_defaults)(
+                    provider, raw_token, profile_data)
+        if identifier is None:
+            return self.handle_login_failure(provider, 'Could not determine uid.')
+
+        with timer('callback_phase', provider=provider.id, phase='upsert'):
+            account, created = await sync_to_async(self.save_account)(
+                provider, identifier, account_defaults)
+
+        self.message_account_saved(account, created)
+        return redirect(self.get_login_redirect(provider, account))
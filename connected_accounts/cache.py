@@ -0,0 +1,126 @@
+from __future__ import unicode_literals
+
+import hashlib
+import time
+from calendar import timegm
+
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+
+from .conf import settings
+from .utils import KeyedLock, LRUCache
+
+try:
+    from django.core.cache import caches
+except ImportError:  # pragma: no cover
+    # Django < 1.7
+    from django.core.cache import get_cache
+else:
+    def get_cache(alias):
+        return caches[alias]
+
+try:
+    from django.utils.module_loading import import_string
+except ImportError:  # pragma: no cover
+    # Django < 1.7
+    from django.utils.module_loading import import_by_path as import_string
+
+
+def get_account_json_key(account):
+    timestamp = timegm(account.last_login.utctimetuple()) if account.last_login else 0
+    return 'connected_accounts:account-json:{0}:{1}'.format(account.pk, timestamp)
+
+
+def get_account_json(account):
+    """
+    Return ``(content, etag)`` for ``Account.to_json()``, cached until the
+    account is saved or its access token expires.
+    """
+    cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+    key = get_account_json_key(account)
+    cached = cache.get(key)
+    if cached is None:
+        content = account.to_json()
+        cached = (content, hashlib.md5(force_bytes(content)).hexdigest())
+
+        timeout = settings.CONNECTED_ACCOUNTS_JSON_CACHE_TIMEOUT
+        if account.expires_at:
+            # The serialized data contains the access token.
+            remaining = int((account.expires_at - timezone.now()).total_seconds())
+            timeout = min(timeout, remaining)
+        if timeout > 0:
+            cache.set(key, cached, timeout)
+    return cached
+
+
+def invalidate_account_json(sender, instance, **kwargs):
+    cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+    cache.delete(get_account_json_key(instance))
+
+
+class ProfileCache(object):
+    """
+    Caches ``get_profile_data()`` results per provider and access token.
+
+    A process-local LRU sits in front of the Django cache, and concurrent
+    misses for the same key wait for a single remote call.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(settings.CONNECTED_ACCOUNTS_PROFILE_CACHE_SIZE)
+        self.locks = KeyedLock()
+
+    def get_key(self, provider, raw_token):
+        digest = hashlib.sha256(force_bytes(raw_token)).hexdigest()
+        return 'connected_accounts:profile:{0}:{1}'.format(provider.id, digest)
+
+    def get_timeout(self, provider):
+        timeouts = settings.CONNECTED_ACCOUNTS_PROFILE_CACHE_TTLS
+        return timeouts.get(provider.id, settings.CONNECTED_ACCOUNTS_PROFILE_CACHE_TTL)
+
+    def get(self, provider, raw_token):
+        key = self.get_key(provider, raw_token)
+        data = self.local.get(key)
+        if data is None:
+            cached = get_cache(settings.CONNECTED_ACCOUNTS_CACHE).get(key)
+            if cached is not None:
+                expires, data = cached
+                # Keep the local copy no longer than the shared one.
+                self.local.set(key, data, max(0, expires - time.time()))
+        return data
+
+    def set(self, provider, raw_token, data):
+        key = self.get_key(provider, raw_token)
+        timeout = self.get_timeout(provider)
+        self.local.set(key, data, timeout)
+        get_cache(settings.CONNECTED_ACCOUNTS_CACHE).set(key, (time.time() + timeout, data), timeout)
+
+    def delete(self, provider, raw_token):
+        key = self.get_key(provider, raw_token)
+        self.local.delete(key)
+        get_cache(settings.CONNECTED_ACCOUNTS_CACHE).delete(key)
+
+    def get_or_fetch(self, provider, raw_token, fetch):
+        """Return cached profile data, calling ``fetch(raw_token)`` on a miss."""
+        data = self.get(provider, raw_token)
+        if data is None:
+            with self.locks(self.get_key(provider, raw_token)):
+                data = self.get(provider, raw_token)
+                if data is None:
+                    data = fetch(raw_token)
+                    if data is not None:
+                        self.set(provider, raw_token, data)
+        return data
+
+
+profile_cache = None
+
+
+def get_profile_cache():
+    """Return the profile cache, or ``None`` unless it is enabled."""
+    global profile_cache
+    if not settings.CONNECTED_ACCOUNTS_PROFILE_CACHE:
+        return None
+    if profile_cache is None:
+        profile_cache = import_string(settings.CONNECTED_ACCOUNTS_PROFILE_CACHE_CLASS)()
+    return profile_cache
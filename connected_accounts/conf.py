@@ -35,5 +35,70 @@ class ConnectedAccountsAppConf(AppConf):
     DISQUS_CONSUMER_SECRET = None
     DISQUS_SCOPE = ['read', 'write', ]
 
+    PROVIDERS = []
+    PROVIDER_ENTRY_POINTS = True
+    AUTODISCOVER = True
+
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_MAXSIZE = 10
+    HTTP_POOL_BLOCK = False
+    HTTP_TIMEOUT = 10
+    HTTP_TIMEOUTS = {}
+
+    RATE_LIMITS = {}
+    RATE_LIMIT_PER_TOKEN = False
+    RATE_LIMIT_SHARED = False
+    RATE_LIMIT_MAX_WAIT = 10
+    RATE_LIMIT_BACKOFF = 60
+
+    RETRIES = 2
+    RETRY_BACKOFF = 0.5
+    RETRY_BACKOFF_MAX = 10
+    RETRY_STATUSES = [500, 502, 503, 504]
+    CIRCUIT_BREAKER_THRESHOLD = 5
+    CIRCUIT_BREAKER_TIMEOUT = 30
+
+    INSTRUMENTATION = False
+    INSTRUMENTATION_SINKS = [
+        'connected_accounts.instrumentation.SignalSink',
+        'connected_accounts.instrumentation.HistogramSink',
+    ]
+    INSTRUMENTATION_HISTOGRAM_SIZE = 1000
+
+    TOKEN_CACHE_SIZE = 1000
+    SIGNER_CACHE_SIZE = 1000
+
+    NATIVE_JSON = False
+
+    PROFILE_CACHE = False
+    PROFILE_CACHE_CLASS = 'connected_accounts.cache.ProfileCache'
+    PROFILE_CACHE_TTL = 300
+    PROFILE_CACHE_TTLS = {}
+    PROFILE_CACHE_SIZE = 1000
+
+    STATELESS_STATE = False
+    STATE_MAX_AGE = 600
+
+    REQUEST_TOKEN_STORE = 'connected_accounts.token_store.SessionRequestTokenStore'
+    REQUEST_TOKEN_TTL = 600
+    REQUEST_TOKEN_POOL = False
+    REQUEST_TOKEN_POOL_SIZE = 5
+    REQUEST_TOKEN_POOL_TTL = 300
+
+    ASYNC_VIEWS = False
+
+    CACHE = 'default'
+    JSON_CACHE_TIMEOUT = 300
+
+    REFRESH_WINDOW = 600
+    REFRESH_BATCH_SIZE = 50
+    REFRESH_WORKERS = 4
+    REFRESH_LEASE = 300
+    REFRESH_BACKOFF_MAX = 86400
+
+    SYNC_WORKERS = 8
+    SYNC_BATCH_SIZE = 100
+    SYNC_PROVIDER_CONCURRENCY = {}
+
     class Meta:
         prefix = 'connected_accounts'
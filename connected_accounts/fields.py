@@ -1,4 +1,13 @@
 from django.db.models import ForeignKey
+from jsonfield import JSONField
+
+from .conf import settings
+
+try:
+    string_types = basestring
+except NameError:
+    # Python 3.X
+    string_types = str
 
 
 class AccountField(ForeignKey):
@@ -27,3 +36,29 @@ class AccountField(ForeignKey):
         field_class = 'django.db.models.fields.related.ForeignKey'
         args, kwargs = introspector(self)
         return (field_class, args, kwargs)
+
+
+class ExtraDataField(JSONField):
+    """
+    A ``JSONField`` stored in a native ``jsonb`` column on PostgreSQL when
+    ``CONNECTED_ACCOUNTS_NATIVE_JSON`` is enabled, and as text otherwise.
+    """
+
+    def db_type(self, connection):
+        if settings.CONNECTED_ACCOUNTS_NATIVE_JSON and connection.vendor == 'postgresql':
+            return 'jsonb'
+        return super(ExtraDataField, self).db_type(connection)
+
+    def from_db_value(self, value, *args, **kwargs):
+        # psycopg2 already decodes jsonb columns.
+        from_db_value = getattr(super(ExtraDataField, self), 'from_db_value', None)
+        if from_db_value is not None and isinstance(value, string_types):
+            return from_db_value(value, *args, **kwargs)
+        return value
+
+    def south_field_triple(self):
+        """Returns a suitable description of this field for South."""
+        from south.modelsinspector import introspector
+        field_class = 'jsonfield.fields.JSONField'
+        args, kwargs = introspector(self)
+        return (field_class, args, kwargs)
@@ -0,0 +1,171 @@
+"""
+Timings for provider HTTP calls and the phases of the OAuth callback.
+
+Nothing is measured unless ``CONNECTED_ACCOUNTS_INSTRUMENTATION`` is set;
+``timer()`` then hands back a shared no-op. Otherwise each timing goes to
+the sinks listed in ``CONNECTED_ACCOUNTS_INSTRUMENTATION_SINKS``::
+
+    with timer('provider_call', provider='twitter', operation='profile') as t:
+        response = ...
+        t.tag(status=response.status_code)
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+from collections import deque
+
+from django.dispatch import Signal
+
+from .conf import settings
+
+try:
+    from django.utils.module_loading import import_string
+except ImportError:  # pragma: no cover
+    # Django < 1.7
+    from django.utils.module_loading import import_by_path as import_string
+
+logger = logging.getLogger('connected_accounts.instrumentation')
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# Sent with ``name``, ``elapsed`` (seconds) and ``tags`` for every timing.
+timing_recorded = Signal()
+
+
+class NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def tag(self, **tags):
+        pass
+
+null_timer = NullTimer()
+
+
+class Timer(object):
+
+    def __init__(self, name, tags, sinks):
+        self.name = name
+        self.tags = tags
+        self.sinks = sinks
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = clock() - self.start
+        if exc_type is not None:
+            self.tags['error'] = exc_type.__name__
+        for sink in self.sinks:
+            sink.record(self.name, elapsed, self.tags)
+        return False
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+
+class Histogram(object):
+    """Keeps the most recent ``size`` samples to work out percentiles."""
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        index = max(0, int(round(percent / 100.0 * len(samples))) - 1)
+        return samples[index]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class HistogramRegistry(object):
+    """One ``Histogram`` per timing name and set of tags."""
+
+    def __init__(self):
+        self.histogram_map = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, elapsed, tags):
+        key = (name, tuple(sorted(tags.items())))
+        with self.lock:
+            histogram = self.histogram_map.get(key)
+            if histogram is None:
+                histogram = Histogram(settings.CONNECTED_ACCOUNTS_INSTRUMENTATION_HISTOGRAM_SIZE)
+                self.histogram_map[key] = histogram
+            histogram.add(elapsed)
+
+    def get(self, name, **tags):
+        return self.histogram_map.get((name, tuple(sorted(tags.items()))))
+
+    def summary(self):
+        """Return ``[{'name', 'tags', 'count', 'mean', 'p50', 'p95', 'p99'}]``."""
+        with self.lock:
+            items = list(self.histogram_map.items())
+        results = []
+        for (name, tags), histogram in sorted(items, key=lambda item: repr(item[0])):
+            result = histogram.summary()
+            result.update(name=name, tags=dict(tags))
+            results.append(result)
+        return results
+
+    def clear(self):
+        with self.lock:
+            self.histogram_map = {}
+
+histograms = HistogramRegistry()
+
+
+class SignalSink(object):
+    def record(self, name, elapsed, tags):
+        timing_recorded.send(sender=Timer, name=name, elapsed=elapsed, tags=tags)
+
+
+class LoggingSink(object):
+    def record(self, name, elapsed, tags):
+        logger.info('{0} {1:.2f}ms {2}'.format(name, elapsed * 1000, ' '.join(
+            '{0}={1}'.format(key, value) for key, value in sorted(tags.items()))))
+
+
+class HistogramSink(object):
+    def record(self, name, elapsed, tags):
+        histograms.record(name, elapsed, tags)
+
+
+sinks = {}
+
+
+def get_sinks():
+    paths = tuple(settings.CONNECTED_ACCOUNTS_INSTRUMENTATION_SINKS)
+    if paths not in sinks:
+        sinks[paths] = [import_string(path)() for path in paths]
+    return sinks[paths]
+
+
+def timer(name, **tags):
+    """Return a context manager that times its block, or a no-op when disabled."""
+    if not settings.CONNECTED_ACCOUNTS_INSTRUMENTATION:
+        return null_timer
+    return Timer(name, tags, get_sinks())
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from connected_accounts.provider_pool import providers
+
+
+class Command(BaseCommand):
+    help = 'List registered providers with their import and instantiation times.'
+
+    def handle(self, *args, **options):
+        for provider in sorted(providers.get_list(), key=lambda provider: provider.id):
+            timings = providers.timings.get(provider.id, {})
+            self.stdout.write('{0:<12} {1:<8} import {2} instantiate {3}'.format(
+                provider.id,
+                'enabled' if provider.is_enabled else 'disabled',
+                self.format_time(timings.get('import')),
+                self.format_time(timings.get('instantiate'))))
+
+    def format_time(self, elapsed):
+        return '-' if elapsed is None else '{0:.2f}ms'.format(elapsed * 1000)
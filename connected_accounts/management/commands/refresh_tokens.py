@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from connected_accounts.refresh import TokenRefresher
+
+
+class Command(BaseCommand):
+    help = 'Refresh OAuth2 access tokens that are about to expire.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider', action='append', dest='providers', default=[],
+            help='Only refresh accounts for this provider (may be repeated).')
+        parser.add_argument(
+            '--window', type=int, default=None,
+            help='Refresh tokens expiring within this many seconds.')
+        parser.add_argument(
+            '--batch-size', type=int, default=None, dest='batch_size',
+            help='Number of accounts each worker claims at a time.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of concurrent refresh workers.')
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and sweep again every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        refresher = TokenRefresher(
+            window=options['window'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            provider_ids=options['providers'],
+        )
+
+        while True:
+            results = refresher.run()
+            self.stdout.write(
+                'Refreshed {refreshed} access token(s), {failed} failed.'.format(**results))
+            if refresher.failed and int(options['verbosity']) > 1:
+                self.stdout.write('Failed accounts: {0}'.format(
+                    ', '.join(str(pk) for pk in refresher.failed)))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from connected_accounts.sync import ProfileSync
+
+
+class Command(BaseCommand):
+    help = 'Re-fetch profile data for connected accounts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider', action='append', dest='providers', default=[],
+            help='Only sync accounts for this provider (may be repeated).')
+        parser.add_argument(
+            '--older-than', type=float, default=None, dest='older_than',
+            help='Only sync accounts not updated in this many days.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of concurrent profile fetches.')
+        parser.add_argument(
+            '--batch-size', type=int, default=None, dest='batch_size',
+            help='Number of accounts written back per query.')
+
+    def handle(self, *args, **options):
+        older_than = None
+        if options['older_than'] is not None:
+            older_than = timedelta(days=options['older_than'])
+
+        sync = ProfileSync(
+            provider_ids=options['providers'],
+            older_than=older_than,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            progress=self.report if int(options['verbosity']) > 0 else None,
+        )
+        stats = sync.run()
+        self.stdout.write(
+            'Synced {updated} of {processed} profile(s), {failed} failed '
+            'in {elapsed:.1f}s ({rate:.1f}/s).'.format(**stats))
+
+    def report(self, stats):
+        self.stdout.write(
+            '{processed} processed, {updated} updated, {failed} failed '
+            '({rate:.1f}/s)'.format(**stats))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def remove_duplicate_accounts(apps, schema_editor):
+    """Keep the most recently used account for each (provider, uid)."""
+    Account = apps.get_model('connected_accounts', 'Account')
+    db_alias = schema_editor.connection.alias
+    duplicates = Account.objects.using(db_alias).values('provider', 'uid') \
+        .annotate(count=models.Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        accounts = Account.objects.using(db_alias).filter(
+            provider=duplicate['provider'], uid=duplicate['uid']).order_by('-last_login', '-id')
+        Account.objects.using(db_alias).filter(
+            pk__in=list(accounts.values_list('pk', flat=True)[1:])).delete()
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connected_accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_accounts, noop),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('connected_accounts', '0002_remove_duplicate_accounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='last_login',
+            field=models.DateTimeField(auto_now=True, verbose_name='Last login', db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, null=True, verbose_name='Expires at', blank=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='account',
+            unique_together=set([('provider', 'uid')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='account',
+            index_together=set([('user', 'provider')]),
+        ),
+    ]
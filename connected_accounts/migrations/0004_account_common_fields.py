@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+import connected_accounts.fields
+
+EXTRA_DATA_INDEX = 'connected_accounts_account_extra_data_gin'
+
+# provider id -> extra_data keys for (email, username, name, first name, last name),
+# as each provider's extract_common_fields() read them at this migration.
+COMMON_FIELDS = {
+    'bitly': (None, 'login', 'full_name', None, None),
+    'disqus': ('email', 'username', 'name', None, None),
+    'facebook': ('email', None, None, 'first_name', 'last_name'),
+    'google': ('email', None, None, 'given_name', 'family_name'),
+    'instagram': (None, 'username', 'full_name', None, None),
+    'mailchimp': (None, None, 'accountname', None, None),
+    'twitter': (None, 'screen_name', 'name', None, None),
+}
+
+
+def get_common_fields(provider, data):
+    """Return ``(email, username, name)``, lowercasing email and username."""
+    email, username, name, first_name, last_name = [
+        (data.get(key) or '') if key else '' for key in COMMON_FIELDS[provider]]
+    name = name or ' '.join(part for part in (first_name, last_name) if part)
+    return email.lower()[:254], username.lower()[:255], name[:255]
+
+
+def populate_common_fields(apps, schema_editor):
+    Account = apps.get_model('connected_accounts', 'Account')
+    db_alias = schema_editor.connection.alias
+    for account in Account.objects.using(db_alias).iterator():
+        if account.provider not in COMMON_FIELDS or not account.extra_data:
+            continue
+        email, username, name = get_common_fields(account.provider, account.extra_data)
+        Account.objects.using(db_alias).filter(pk=account.pk).update(
+            email=email, username=username, name=name)
+
+
+def create_extra_data_index(apps, schema_editor):
+    native_json = getattr(settings, 'CONNECTED_ACCOUNTS_NATIVE_JSON', False)
+    if native_json and schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX {0} ON connected_accounts_account '
+            'USING GIN (extra_data jsonb_path_ops)'.format(EXTRA_DATA_INDEX))
+
+
+def drop_extra_data_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS {0}'.format(EXTRA_DATA_INDEX))
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connected_accounts', '0003_account_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='email',
+            field=models.CharField(default='', max_length=254, verbose_name='Email', db_index=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='username',
+            field=models.CharField(default='', max_length=255, verbose_name='Username', db_index=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='name',
+            field=models.CharField(default='', max_length=255, verbose_name='Name', db_index=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='extra_data',
+            field=connected_accounts.fields.ExtraDataField(verbose_name='Extra data', editable=False),
+        ),
+        migrations.RunPython(populate_common_fields, noop),
+        migrations.RunPython(create_extra_data_index, drop_extra_data_index),
+    ]
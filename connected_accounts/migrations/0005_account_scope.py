@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connected_accounts', '0004_account_common_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='scope',
+            field=models.TextField(default='', verbose_name='Scope', editable=False, blank=True),
+        ),
+    ]
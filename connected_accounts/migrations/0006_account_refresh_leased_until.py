@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connected_accounts', '0005_account_scope'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='refresh_leased_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Refresh leased until'),
+        ),
+    ]
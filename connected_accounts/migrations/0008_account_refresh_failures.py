@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connected_accounts', '0007_account_synced_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='refresh_failures',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Refresh failures'),
+        ),
+    ]
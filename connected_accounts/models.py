@@ -5,29 +5,41 @@ import json
 import logging
 
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
-from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
-from jsonfield import JSONField
 
 from .conf import settings
+from .fields import ExtraDataField
 from .provider_pool import providers
+from .utils import KeyedLock, get_common_fields
+
+try:
+    from django.utils.encoding import python_2_unicode_compatible
+except ImportError:  # pragma: no cover
+    # Django >= 3.0 only runs on Python 3
+    def python_2_unicode_compatible(klass):
+        return klass
 
 logger = logging.getLogger('connected_accounts')
 
+refresh_locks = KeyedLock()
+
+COMMON_FIELDS = ('email', 'username', 'name', )
+
 
 @python_2_unicode_compatible
 class Account(models.Model):
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, verbose_name=_('User'), editable=False)
+        settings.AUTH_USER_MODEL, verbose_name=_('User'), editable=False,
+        on_delete=models.CASCADE)
     provider = models.CharField(
         verbose_name=_('Provider'), max_length=50,
         choices=providers.as_choices())
 
     uid = models.CharField(verbose_name=_('UID'), max_length=255)
     last_login = models.DateTimeField(
-        verbose_name=_('Last login'), auto_now=True)
+        verbose_name=_('Last login'), auto_now=True, db_index=True)
     date_added = models.DateTimeField(
         verbose_name=_('Date added'), auto_now_add=True)
     raw_token = models.TextField(editable=False)
@@ -38,14 +50,45 @@ class Account(models.Model):
         verbose_name=_('OAuth Token Secret'), blank=True, null=True,
         help_text=_('"oauth_token_secret" (OAuth1) or refresh token (OAuth2)'))
 
-    extra_data = JSONField(verbose_name=_('Extra data'), editable=False)
-    expires_at = models.DateTimeField(_('Expires at'), blank=True, null=True)
+    extra_data = ExtraDataField(verbose_name=_('Extra data'), editable=False)
+    # Denormalized from ``extra_data`` so accounts can be looked up by index.
+    email = models.CharField(
+        verbose_name=_('Email'), max_length=254, blank=True, default='',
+        editable=False, db_index=True)
+    username = models.CharField(
+        verbose_name=_('Username'), max_length=255, blank=True, default='',
+        editable=False, db_index=True)
+    name = models.CharField(
+        verbose_name=_('Name'), max_length=255, blank=True, default='',
+        editable=False, db_index=True)
+    expires_at = models.DateTimeField(_('Expires at'), blank=True, null=True, db_index=True)
+    # Space separated, as granted by the provider or requested when it does not say.
+    scope = models.TextField(verbose_name=_('Scope'), blank=True, default='', editable=False)
+    # When ProfileSync last re-fetched extra_data.
+    synced_at = models.DateTimeField(
+        verbose_name=_('Synced at'), blank=True, null=True, editable=False)
+    # Set by TokenRefresher while it refreshes the token ahead of time.
+    refresh_leased_until = models.DateTimeField(
+        verbose_name=_('Refresh leased until'), blank=True, null=True, editable=False)
+    # Failed refreshes in a row, which push the next lease further out.
+    refresh_failures = models.PositiveSmallIntegerField(
+        verbose_name=_('Refresh failures'), default=0, editable=False)
 
     def __str__(self):
         return self.get_provider_account().to_str()
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'extra_data' in update_fields:
+            self.update_common_fields()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(COMMON_FIELDS)
+        super(Account, self).save(*args, **kwargs)
+
     class Meta:
         ordering = ('-last_login', )
+        unique_together = (('provider', 'uid'), )
+        index_together = (('user', 'provider'), )
 
     @property
     def is_expired(self):
@@ -70,18 +113,53 @@ class Account(models.Model):
             self._provider_account = self.get_provider().wrap_account(self)
         return self._provider_account
 
+    def update_common_fields(self):
+        """Copy email, username and name out of ``extra_data``."""
+        provider = self.get_provider()
+        data = {}
+        if provider is not None and self.extra_data:
+            data = provider.wrap_account(self).extract_common_fields()
+        self.email, self.username, self.name = get_common_fields(data)
+
     def refresh_access_token(self):
-        """Refreshing an OAuth2 access token using refresh_token."""
-        raw_token = self.get_provider().refresh_access_token(
-            self.raw_token, refresh_token=self.oauth_token_secret)
-        if raw_token is None:
-            logger.error('Unable to refresh access token')
-            return False
-
-        self.raw_token = raw_token
-        self.oauth_token, _, self.expires_at = \
-            self.get_provider().parse_raw_token(raw_token)
-        self.save(update_fields=('raw_token', 'oauth_token', 'expires_at', ))
+        """
+        Refreshing an OAuth2 access token using refresh_token.
+
+        Concurrent callers are collapsed into a single refresh: the account
+        row is locked (and, within a process, a per-account lock is held)
+        while the provider is called. Callers that were waiting simply pick
+        up the token stored by whoever refreshed first.
+        """
+        using = self._state.db or router.db_for_write(Account, instance=self)
+        with refresh_locks((using, self.pk)):
+            with transaction.atomic(using=using):
+                current = Account._default_manager.using(using) \
+                    .select_for_update().get(pk=self.pk)
+                if current.raw_token != self.raw_token:
+                    # Somebody else refreshed the token while we were waiting.
+                    for field in ('raw_token', 'oauth_token', 'oauth_token_secret', 'expires_at'):
+                        setattr(self, field, getattr(current, field))
+                    return True
+
+                raw_token = self.get_provider().refresh_access_token(
+                    self.raw_token, refresh_token=self.oauth_token_secret)
+                if raw_token is None:
+                    logger.error('Unable to refresh access token')
+                    return False
+
+                self.raw_token = raw_token
+                self.oauth_token, refresh_token, self.expires_at = \
+                    self.get_provider().parse_raw_token(raw_token)
+                if refresh_token:
+                    # Some providers rotate the refresh token on every use.
+                    self.oauth_token_secret = refresh_token
+                # Release any TokenRefresher lease along with the new token.
+                self.refresh_leased_until = None
+                self.refresh_failures = 0
+                self.save(using=using, update_fields=(
+                    'raw_token', 'oauth_token', 'oauth_token_secret', 'expires_at',
+                    'refresh_leased_until', 'refresh_failures', ))
+        return True
 
     def get_token(self):
         """Returns oauth_token (OAuth1) or access token (OAuth2)"""
@@ -98,6 +176,19 @@ class Account(models.Model):
         """ Returns oauth_token_secret (OAuth1) or refresh_token (OAuth2)"""
         return self.oauth_token_secret or None
 
+    def get_scope(self):
+        """Return the list of scopes granted to this account."""
+        return self.scope.split()
+
+    def get_api_session(self):
+        """
+        Return a session for calling the provider's API as this account,
+        refreshing an expired token first.
+        """
+        if self.is_expired:
+            self.refresh_access_token()
+        return self.get_provider().get_api_session(self.raw_token)
+
     def get_common_data(self):
         data = {
             'provider_name': self.get_provider().to_str(),
@@ -1,41 +1,162 @@
-from django.conf import settings
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from django.utils.module_loading import module_has_submodule
+
+from .conf import settings
 
 try:
     import importlib
-except ImportError:
+except ImportError:  # pragma: no cover
     from django.utils import importlib
 
+try:
+    from django.apps import apps
+except ImportError:  # pragma: no cover
+    # Django < 1.7
+    apps = None
+
+try:
+    from django.utils.module_loading import import_string
+except ImportError:  # pragma: no cover
+    # Django < 1.7
+    from django.utils.module_loading import import_by_path as import_string
+
+
+logger = logging.getLogger('connected_accounts')
+
+ENTRY_POINT_GROUP = 'connected_accounts.providers'
+
+# module name -> whether it has a ``provider`` submodule
+submodule_cache = {}
+
+
+def iter_entry_points(group):
+    # Imported here, as scanning installed distributions is only needed
+    # during discovery.
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # pragma: no cover
+        # Python < 3.8
+        try:
+            from pkg_resources import iter_entry_points
+        except ImportError:
+            return []
+        return iter_entry_points(group)
+    try:
+        return entry_points(group=group)
+    except TypeError:
+        # Python < 3.10
+        return entry_points().get(group, [])
+
+
+def has_provider_module(module):
+    """Cached check for a ``provider`` submodule that does not import it."""
+    try:
+        return submodule_cache[module.__name__]
+    except KeyError:
+        found = module_has_submodule(module, 'provider')
+        submodule_cache[module.__name__] = found
+        return found
+
 
 class ProviderRegistry(object):
+    """
+    Registered provider classes, instantiated on first use.
+
+    Providers are found through ``CONNECTED_ACCOUNTS_PROVIDERS`` (dotted
+    paths to provider classes), the ``connected_accounts.providers`` entry
+    point group and, unless ``CONNECTED_ACCOUNTS_AUTODISCOVER`` is off, a
+    ``provider`` module in any installed app.
+    """
+
     def __init__(self):
         self.provider_map = {}
+        self.instances = {}
+        self.timings = {}
         self.discovered = False
+        self.lock = threading.RLock()
 
     def get_list(self):
         self.discover_providers()
-        return self.provider_map.values()
+        return [self.get_instance(id) for id in list(self.provider_map)]
 
     def register(self, cls):
-        self.provider_map[cls.id] = cls()
+        with self.lock:
+            if self.provider_map.get(cls.id) is not cls:
+                self.provider_map[cls.id] = cls
+                self.instances.pop(cls.id, None)
+        return cls
 
     def by_id(self, id):
         self.discover_providers()
-        return self.provider_map.get(id)
+        if id not in self.provider_map:
+            return None
+        return self.get_instance(id)
+
+    def get_instance(self, id):
+        provider = self.instances.get(id)
+        if provider is None:
+            with self.lock:
+                provider = self.instances.get(id)
+                if provider is None:
+                    start = time.time()
+                    provider = self.provider_map[id]()
+                    self.record_timing(id, 'instantiate', time.time() - start)
+                    self.instances[id] = provider
+        return provider
 
     def as_choices(self, enabled_only=False):
         self.discover_providers()
-        for provider in self.get_list():
-            if not enabled_only or (enabled_only and provider.is_enabled):
-                yield (provider.id, provider.name)
+        for id, cls in list(self.provider_map.items()):
+            if not enabled_only or self.get_instance(id).is_enabled:
+                yield (id, cls.name)
 
     def discover_providers(self):
-        if not self.discovered:
+        if self.discovered:
+            return
+        with self.lock:
+            if self.discovered:
+                return
+            for path in settings.CONNECTED_ACCOUNTS_PROVIDERS:
+                self.load(path, import_string)
+            if settings.CONNECTED_ACCOUNTS_PROVIDER_ENTRY_POINTS:
+                for entry_point in iter_entry_points(ENTRY_POINT_GROUP):
+                    self.load(entry_point.name, lambda name: entry_point.load())
+            if settings.CONNECTED_ACCOUNTS_AUTODISCOVER:
+                self.autodiscover()
+            self.discovered = True
+
+    def autodiscover(self):
+        if apps is not None and apps.apps_ready:
+            modules = [app_config.module for app_config in apps.get_app_configs()]
+        else:
+            modules = []
             for app in settings.INSTALLED_APPS:
-                provider_module = app + '.provider'
                 try:
-                    importlib.import_module(provider_module)
+                    modules.append(importlib.import_module(app))
                 except ImportError:
                     pass
-            self.discovered = True
+        for module in modules:
+            if has_provider_module(module):
+                self.load(module.__name__ + '.provider', importlib.import_module)
+
+    def load(self, name, loader):
+        """Import ``name`` and record how long it took for each provider it registered."""
+        before = set(self.provider_map)
+        start = time.time()
+        obj = loader(name)
+        elapsed = time.time() - start
+        if isinstance(obj, type):
+            self.register(obj)
+        for id in set(self.provider_map) - before:
+            self.record_timing(id, 'import', elapsed)
+
+    def record_timing(self, id, phase, elapsed):
+        self.timings.setdefault(id, {})[phase] = elapsed
+        logger.debug('Provider {0}: {1} took {2:.2f}ms'.format(id, phase, elapsed * 1000))
 
 providers = ProviderRegistry()
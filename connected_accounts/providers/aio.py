@@ -0,0 +1,314 @@
+"""
+Asyncio counterparts of the provider network calls.
+
+Requires ``httpx`` (``pip install django-connected[async]``). Arguments are
+built by the same helpers as the blocking API, so the two stay in step.
+"""
+import logging
+import weakref
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_text
+
+from connected_accounts.cache import get_profile_cache
+from connected_accounts.conf import settings
+from connected_accounts.instrumentation import timer
+from connected_accounts.session_pool import BlockAllCookies, sessions
+from connected_accounts.token_pool import request_token_pool
+from connected_accounts.utils import LazyImports, get_scope_kwargs
+
+try:
+    from urllib.parse import urlencode
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from urllib import urlencode
+
+
+logger = logging.getLogger('connected_accounts')
+
+# Modules that import requests, loaded on first network use.
+lazy = LazyImports(
+    ratelimit='connected_accounts.ratelimit',
+    retry='connected_accounts.retry',
+)
+
+
+def import_httpx():
+    """Import httpx on first use so loading the providers stays cheap."""
+    try:
+        import httpx
+    except ImportError:
+        raise ImproperlyConfigured(
+            'The async provider API requires httpx: pip install httpx')
+    return httpx
+
+
+class AsyncClientPool(object):
+    """
+    Hands out one pooled ``httpx.AsyncClient`` per provider and event loop,
+    the async equivalent of ``connected_accounts.session_pool.SessionPool``.
+    """
+
+    def __init__(self):
+        self.client_map = weakref.WeakKeyDictionary()
+
+    def get_client(self, provider_id):
+        from http.cookiejar import CookieJar
+
+        import asyncio
+
+        httpx = import_httpx()
+        clients = self.client_map.setdefault(asyncio.get_event_loop(), {})
+        client = clients.get(provider_id)
+        if client is None:
+            maxsize = settings.CONNECTED_ACCOUNTS_HTTP_POOL_MAXSIZE
+            client = httpx.AsyncClient(
+                cookies=CookieJar(policy=BlockAllCookies()),
+                limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize),
+            )
+            clients[provider_id] = client
+        return client
+
+    def get_timeout(self, provider_id):
+        httpx = import_httpx()
+
+        timeout = sessions.get_timeout(provider_id)
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return timeout
+
+    async def aclose(self):
+        import asyncio
+
+        clients = self.client_map.pop(asyncio.get_event_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+async_clients = AsyncClientPool()
+
+
+def get_request_errors():
+    """Exceptions that a failed provider call is reported with."""
+    from connected_accounts.ratelimit import RateLimitExceeded
+    from connected_accounts.retry import CircuitOpenError
+
+    return (import_httpx().HTTPError, RateLimitExceeded, CircuitOpenError)
+
+
+async def run_sync(func, *args):
+    """Call a blocking function (e.g. a cache backend) off the event loop."""
+    try:
+        from asgiref.sync import sync_to_async
+    except ImportError:  # pragma: no cover
+        return func(*args)
+    return await sync_to_async(func)(*args)
+
+
+async def run_shared(func, *args):
+    """Call ``func`` off the event loop only if it may use the cache backend."""
+    if settings.CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED:
+        return await run_sync(func, *args)
+    return func(*args)
+
+
+async def acall(provider_id, send, retry=False):
+    """Async counterpart of ``connected_accounts.retry.call``."""
+    import asyncio
+    from connected_accounts.retry import breakers, get_attempts, get_backoff, is_retryable_status
+
+    httpx = import_httpx()
+    breaker = breakers.get(provider_id)
+    attempts = get_attempts(retry)
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            response = await send()
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                raise
+            logger.info('Retrying {0} call after error: {1}'.format(provider_id, e))
+        except Exception:
+            breaker.release()
+            raise
+        else:
+            if not is_retryable_status(response.status_code):
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                return response
+            logger.info('Retrying {0} call after HTTP {1}'.format(provider_id, response.status_code))
+        await asyncio.sleep(get_backoff(attempt))
+
+
+def sign_request(client, method, url, kwargs):
+    """Sign a request with an ``oauthlib.oauth1.Client``, returning ``(url, kwargs)``."""
+    params = kwargs.pop('params', None)
+    if params:
+        url = '{0}{1}{2}'.format(url, '&' if '?' in url else '?', urlencode(params))
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    body = None
+    data = kwargs.pop('data', None)
+    if data:
+        body = urlencode(data)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+    url, headers, body = client.sign(url, http_method=method.upper(), body=body, headers=headers)
+    kwargs.update(headers=headers, content=body)
+    return url, kwargs
+
+
+class AsyncProviderMixin(object):
+
+    async def arequest(self, method, url, **kwargs):
+        """Build remote url request without blocking the event loop."""
+        token = kwargs.pop('token', self.token)
+        retry = kwargs.pop('retry', method.upper() in lazy.retry.IDEMPOTENT_METHODS)
+        operation = kwargs.pop('operation', 'request')
+        kwargs.setdefault('timeout', async_clients.get_timeout(self.id))
+        client = async_clients.get_client(self.id)
+
+        async def send():
+            await self.await_rate_limit(token, operation)
+            with timer('provider_call', provider=self.id, operation=operation) as t:
+                response = await client.request(method, url, **kwargs)
+                t.tag(status=response.status_code)
+            await run_shared(lazy.ratelimit.rate_limiter.update, self, response, token, operation)
+            return response
+
+        return await acall(self.id, send, retry=retry)
+
+    async def await_rate_limit(self, token, operation=None):
+        """Wait, without blocking the event loop, until a call is allowed."""
+        import asyncio
+
+        wait = await run_shared(lazy.ratelimit.rate_limiter.get_wait, self, token, operation)
+        while wait:
+            await asyncio.sleep(wait)
+            wait = await run_shared(lazy.ratelimit.rate_limiter.get_wait, self, token, operation)
+
+    async def aget_access_token(self, request, callback=None):
+        """Fetch access token from callback request."""
+        errors = get_request_errors()
+        # May use the cache, for request tokens or state nonces.
+        kwargs = await run_sync(self.get_access_token_kwargs, request, callback)
+        if kwargs is None:
+            return None
+        try:
+            response = await self.arequest(
+                'post', self.access_token_url, operation='access_token', **kwargs)
+            response.raise_for_status()
+        except errors as e:
+            logger.error('Unable to fetch access token: {0}'.format(e))
+            return None
+        else:
+            return response.text
+
+    async def arefresh_access_token(self, raw_token, **kwargs):
+        """Refreshing an OAuth2 token using a refresh token."""
+        raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
+
+    async def aget_redirect_url(self, request, callback, parameters=None, granted_scope=None):
+        """Build authentication redirect url."""
+        args = await self.aget_redirect_args(
+            request, callback=callback, **get_scope_kwargs(granted_scope))
+        return self.build_redirect_url(args, parameters)
+
+    async def aget_redirect_args(self, request, callback, granted_scope=None):
+        """Get request parameters for redirect url."""
+        return self.get_redirect_args(
+            request, callback=callback, **get_scope_kwargs(granted_scope))
+
+    async def aget_profile_data(self, raw_token):
+        """Fetch user profile information, through the profile cache if enabled."""
+        profile_cache = get_profile_cache()
+        if profile_cache is None:
+            return await self.afetch_profile_data(raw_token)
+        data = await run_sync(profile_cache.get, self, raw_token)
+        if data is None:
+            data = await self.afetch_profile_data(raw_token)
+            if data is not None:
+                await run_sync(profile_cache.set, self, raw_token, data)
+        return data
+
+    async def afetch_profile_data(self, raw_token):
+        """Fetch user profile information from the provider."""
+        errors = get_request_errors()
+        try:
+            response = await self.arequest(
+                'get', self.profile_url, operation='profile',
+                **self.get_profile_request_kwargs(raw_token))
+            response.raise_for_status()
+        except errors as e:
+            logger.error('Unable to fetch user profile: {0}'.format(e))
+            return None
+        else:
+            return response.json() or response.text
+
+
+class AsyncOAuthProviderMixin(AsyncProviderMixin):
+
+    async def aget_request_token(self, request, callback):
+        """Get an OAuth request token, from the pool if enabled. Only required for OAuth 1.0."""
+        callback = force_text(request.build_absolute_uri(callback))
+        if settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL:
+            raw_token = request_token_pool.get(self, callback)
+            if raw_token is not None:
+                return raw_token
+        return await self.afetch_request_token(callback)
+
+    async def afetch_request_token(self, callback):
+        """Fetch an OAuth request token for the absolute ``callback`` url."""
+        errors = get_request_errors()
+        try:
+            response = await self.arequest(
+                'post', self.request_token_url, oauth_callback=callback,
+                operation='request_token')
+            response.raise_for_status()
+        except errors as e:
+            logger.error('Unable to fetch request token: {0}'.format(e))
+            return None
+        else:
+            return response.text
+
+    async def aget_redirect_args(self, request, callback, granted_scope=None):
+        """Get request parameters for redirect url."""
+        callback = force_text(request.build_absolute_uri(callback))
+        raw_token = await self.aget_request_token(request, callback)
+        return await run_sync(
+            self.get_request_token_redirect_args, request, callback, raw_token, granted_scope)
+
+    async def arequest(self, method, url, **kwargs):
+        """Build remote url request. Signs the request with OAuth 1.0."""
+        from oauthlib.oauth1 import Client
+
+        client = self.get_signer(Client, self.get_signature_kwargs(kwargs))
+        url, kwargs = sign_request(client, method, url, kwargs)
+        # A retry would resend the same nonce, which providers reject.
+        kwargs['retry'] = False
+        return await super(AsyncOAuthProviderMixin, self).arequest(method, url, **kwargs)
+
+
+class AsyncOAuth2ProviderMixin(AsyncProviderMixin):
+
+    async def arefresh_access_token(self, raw_token, **kwargs):
+        """Refreshing an OAuth2 token using a refresh token."""
+        errors = get_request_errors()
+        args = self.get_refresh_token_args(raw_token, **kwargs)
+        try:
+            response = await self.arequest(
+                'post', self.access_token_url, data=args, operation='refresh_token')
+            response.raise_for_status()
+        except errors as e:
+            logger.error('Unable to fetch access token: {0}'.format(e))
+            return None
+        else:
+            return response.text
+
+    async def arequest(self, method, url, **kwargs):
+        """Build remote url request. Constructs necessary auth."""
+        self.add_access_token(kwargs)
+        return await super(AsyncOAuth2ProviderMixin, self).arequest(method, url, **kwargs)
@@ -8,9 +8,27 @@ from django.conf import settings
 from django.utils import timezone
 from django.utils.crypto import constant_time_compare, get_random_string
 from django.utils.encoding import force_text
-from requests.api import request
-from requests.exceptions import RequestException
-from requests_oauthlib import OAuth1
+
+from connected_accounts.cache import get_profile_cache
+from connected_accounts.instrumentation import timer
+from connected_accounts.session_pool import sessions
+from connected_accounts.state import load_state, make_state, use_state
+from connected_accounts.token_pool import request_token_pool
+from connected_accounts.token_store import get_request_token_store
+from connected_accounts.utils import LazyImports, LRUCache, get_scope_kwargs
+
+try:
+    from .aio import AsyncOAuth2ProviderMixin, AsyncOAuthProviderMixin, AsyncProviderMixin
+except SyntaxError:  # pragma: no cover
+    # Python 2.X has no native coroutines, so the async API is unavailable.
+    class AsyncProviderMixin(object):
+        pass
+
+    class AsyncOAuthProviderMixin(AsyncProviderMixin):
+        pass
+
+    class AsyncOAuth2ProviderMixin(AsyncProviderMixin):
+        pass
 
 try:
     from urllib.parse import urlencode, parse_qs
@@ -22,6 +40,20 @@ except ImportError:  # pragma: no cover
 
 logger = logging.getLogger('connected_accounts')
 
+parsed_tokens = LRUCache(settings.CONNECTED_ACCOUNTS_TOKEN_CACHE_SIZE)
+
+# OAuth 1.0 signers, keyed by their class and signature arguments.
+signers = LRUCache(settings.CONNECTED_ACCOUNTS_SIGNER_CACHE_SIZE)
+
+# The HTTP and signing stacks, imported on first network use so that
+# loading the providers stays cheap.
+lazy = LazyImports(
+    RequestException='requests.exceptions.RequestException',
+    OAuth1='requests_oauthlib.OAuth1',
+    ratelimit='connected_accounts.ratelimit',
+    retry='connected_accounts.retry',
+)
+
 
 class ProviderAccount(object):
     def __init__(self, account, provider):
@@ -41,7 +73,31 @@ class ProviderAccount(object):
         return {}
 
 
-class BaseOAuthProvider(object):
+class ProviderSession(object):
+    """
+    Makes API calls for one account. The token is parsed, and any request
+    signer built, once for the life of the session.
+    """
+
+    def __init__(self, provider, raw_token):
+        self.provider = provider
+        self.token = raw_token
+        self.auth = provider.get_token_auth(raw_token)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('token', self.token)
+        if self.auth is not None:
+            kwargs.setdefault('auth', self.auth)
+        return self.provider.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('post', url, **kwargs)
+
+
+class BaseOAuthProvider(AsyncProviderMixin):
     id = ''
     name = ''
     account_class = ProviderAccount
@@ -54,6 +110,9 @@ class BaseOAuthProvider(object):
     consumer_secret = ''
     scope = []
     scope_separator = ' '
+    # Whether a new grant keeps the scopes granted before, so only the
+    # missing ones need to be requested.
+    incremental_scope = False
 
 
     def __init__(self, token=''):
@@ -64,6 +123,21 @@ class BaseOAuthProvider(object):
 
     def get_access_token(self, request, callback=None):
         """Fetch access token from callback request."""
+        kwargs = self.get_access_token_kwargs(request, callback=callback)
+        if kwargs is None:
+            return None
+        try:
+            response = self.request(
+                'post', self.access_token_url, operation='access_token', **kwargs)
+            response.raise_for_status()
+        except lazy.RequestException as e:
+            logger.error('Unable to fetch access token: {0}'.format(e))
+            return None
+        else:
+            return response.text
+
+    def get_access_token_kwargs(self, request, callback=None):
+        """Get request arguments to exchange the callback for an access token."""
         raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
 
     def refresh_access_token(self, raw_token):
@@ -71,23 +145,40 @@ class BaseOAuthProvider(object):
         raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
 
     def get_profile_data(self, raw_token):
-        """Fetch user profile information."""
+        """Fetch user profile information, through the profile cache if enabled."""
+        profile_cache = get_profile_cache()
+        if profile_cache is None:
+            return self.fetch_profile_data(raw_token)
+        return profile_cache.get_or_fetch(self, raw_token, self.fetch_profile_data)
+
+    def fetch_profile_data(self, raw_token):
+        """Fetch user profile information from the provider."""
         try:
-            response = self.request('get', self.profile_url, token=raw_token)
+            response = self.request(
+                'get', self.profile_url, operation='profile',
+                **self.get_profile_request_kwargs(raw_token))
             response.raise_for_status()
-        except RequestException as e:
+        except lazy.RequestException as e:
             logger.error('Unable to fetch user profile: {0}'.format(e))
             return None
         else:
             return response.json() or response.text
 
+    def get_profile_request_kwargs(self, raw_token):
+        """Get request arguments for fetching user profile information."""
+        return {'token': raw_token}
+
     def get_redirect_args(self, request, callback):
         """Get request parameters for redirect url."""
         raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
 
-    def get_redirect_url(self, request, callback, parameters=None):
+    def get_redirect_url(self, request, callback, parameters=None, granted_scope=None):
         """Build authentication redirect url."""
-        args = self.get_redirect_args(request, callback=callback)
+        args = self.get_redirect_args(
+            request, callback=callback, **get_scope_kwargs(granted_scope))
+        return self.build_redirect_url(args, parameters)
+
+    def build_redirect_url(self, args, parameters=None):
         additional = parameters or {}
         args.update(additional)
         params = urlencode(args)
@@ -97,19 +188,112 @@ class BaseOAuthProvider(object):
         """Parse token and secret from raw token response."""
         raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
 
+    def get_parsed_token(self, raw_token):
+        """
+        Return ``(token, secret)`` for signing requests, reusing the result
+        for a token string seen before.
+
+        ``expires_at`` is relative to when a token is parsed, so it is not
+        cached: use ``parse_raw_token()`` when storing a token.
+        """
+        if raw_token is None:
+            return self.parse_raw_token(raw_token)[:2]
+        key = (self.id, raw_token)
+        parsed = parsed_tokens.get(key)
+        if parsed is None:
+            parsed = self.parse_raw_token(raw_token)[:2]
+            parsed_tokens.set(key, parsed)
+        return parsed
+
     def request(self, method, url, **kwargs):
-        """Build remote url request."""
-        return request(method, url, **kwargs)
+        """
+        Build remote url request. Idempotent requests (or any with
+        ``retry=True``) are retried on transient failures.
+        """
+        token = kwargs.pop('token', self.token)
+        retry = kwargs.pop('retry', method.upper() in lazy.retry.IDEMPOTENT_METHODS)
+        operation = kwargs.pop('operation', 'request')
+        kwargs.setdefault('timeout', self.get_timeout())
+        session = self.get_session()
+
+        def send():
+            lazy.ratelimit.rate_limiter.acquire(self, token, operation)
+            with timer('provider_call', provider=self.id, operation=operation) as t:
+                response = session.request(method, url, **kwargs)
+                t.tag(status=response.status_code)
+            lazy.ratelimit.rate_limiter.update(self, response, token, operation)
+            return response
+
+        return lazy.retry.call(self.id, send, retry=retry)
+
+    def get_session(self):
+        """Return the pooled keep-alive session for this provider."""
+        return sessions.get_session(self.id)
+
+    def get_timeout(self):
+        return sessions.get_timeout(self.id)
+
+    def get_api_session(self, raw_token):
+        """Return a ``ProviderSession`` that calls the API as ``raw_token``."""
+        return ProviderSession(self, raw_token)
+
+    def get_token_auth(self, raw_token):
+        """Return the ``auth`` to send with every request for ``raw_token``, if any."""
+        return None
 
     def extract_uid(self, data):
         """Return unique identifier from the profile info."""
         return data.get('id', None)
 
-    def get_scope(self, request):
+    def get_scope(self, request, granted_scope=None):
+        """
+        Return the scopes to request: the configured ones plus any asked for
+        with ``?scope=``. Providers with ``incremental_scope`` leave out the
+        ones in ``granted_scope``.
+        """
+        scope = list(self.scope)
         dynamic_scope = request.GET.get('scope', None)
         if dynamic_scope:
-            self.scope.extend(dynamic_scope.split(','))
-        return self.scope
+            scope.extend(item for item in dynamic_scope.split(',') if item not in scope)
+        if self.incremental_scope and granted_scope:
+            # A scope must still be sent when everything was granted before.
+            scope = [item for item in scope if item not in granted_scope] or scope
+        return scope
+
+    def add_scope_args(self, request, args, granted_scope=None):
+        """
+        Add the scope to redirect arguments. Returns the scopes the account
+        will have been granted once the user agrees.
+        """
+        scope = self.get_scope(request, granted_scope)
+        if scope:
+            args['scope'] = self.scope_separator.join(scope)
+        expected = list(granted_scope or []) if self.incremental_scope else []
+        expected.extend(item for item in scope if item not in expected)
+        return expected
+
+    def store_requested_scope(self, request, scope):
+        """Remember the scopes from ``add_scope_args()`` until the callback."""
+        if scope:
+            request.session[self.scope_session_key] = ' '.join(scope)
+        else:
+            # Only touches (and saves) the session if a scope was stored before.
+            request.session.pop(self.scope_session_key, None)
+
+    def pop_requested_scope(self, request):
+        scope = request.session.pop(self.scope_session_key, None)
+        return scope.split() if scope is not None else None
+
+    def get_granted_scope(self, request, raw_token):
+        """
+        Return the scopes granted with ``raw_token``, or ``None`` if unknown.
+        Unless the provider says otherwise, that is what was requested.
+        """
+        return self.pop_requested_scope(request)
+
+    @property
+    def scope_session_key(self):
+        return 'connected-accounts-{0}-scope'.format(self.id)
 
     def extract_extra_data(self, data):
         return data
@@ -126,57 +310,62 @@ class BaseOAuthProvider(object):
         return force_text(self.name)
 
 
-class OAuthProvider(BaseOAuthProvider):
+class OAuthProvider(AsyncOAuthProviderMixin, BaseOAuthProvider):
     request_token_url = ''
 
-    def get_access_token(self, request, callback=None):
-        """Fetch access token from callback request."""
-        raw_token = request.session.get(self.session_key, None)
+    def get_access_token_kwargs(self, request, callback=None):
+        """Get request arguments to exchange the callback for an access token."""
         verifier = request.GET.get('oauth_verifier', None)
-        if raw_token is not None and verifier is not None:
+        if verifier is None:
+            return None
+        raw_token = get_request_token_store().consume(
+            request, self, request.GET.get('oauth_token', None))
+        if raw_token is not None:
             data = {'oauth_verifier': verifier}
             callback = request.build_absolute_uri(callback or request.path)
             callback = force_text(callback)
-            try:
-                response = self.request(
-                    'post', self.access_token_url,
-                    token=raw_token, data=data, oauth_callback=callback)
-                response.raise_for_status()
-            except RequestException as e:
-                logger.error('Unable to fetch access token: {0}'.format(e))
-                return None
-            else:
-                return response.text
+            return {'token': raw_token, 'data': data, 'oauth_callback': callback}
         return None
 
     def get_request_token(self, request, callback):
-        """Fetch the OAuth request token. Only required for OAuth 1.0."""
+        """Get an OAuth request token, from the pool if enabled. Only required for OAuth 1.0."""
         callback = force_text(request.build_absolute_uri(callback))
+        if settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL:
+            raw_token = request_token_pool.get(self, callback)
+            if raw_token is not None:
+                return raw_token
+        return self.fetch_request_token(callback)
+
+    def fetch_request_token(self, callback):
+        """Fetch an OAuth request token for the absolute ``callback`` url."""
         try:
-            response = self.request('post', self.request_token_url, oauth_callback=callback)
+            # Nothing is consumed by fetching a request token, so it is safe to retry.
+            response = self.request(
+                'post', self.request_token_url, oauth_callback=callback,
+                operation='request_token', retry=True)
             response.raise_for_status()
-        except RequestException as e:
+        except lazy.RequestException as e:
             logger.error('Unable to fetch request token: {0}'.format(e))
             return None
         else:
             return response.text
 
-    def get_redirect_args(self, request, callback):
+    def get_redirect_args(self, request, callback, granted_scope=None):
         """Get request parameters for redirect url."""
         callback = force_text(request.build_absolute_uri(callback))
         raw_token = self.get_request_token(request, callback)
+        return self.get_request_token_redirect_args(request, callback, raw_token, granted_scope)
+
+    def get_request_token_redirect_args(self, request, callback, raw_token, granted_scope=None):
+        """Get request parameters for redirect url once a request token is fetched."""
         token, secret, _ = self.parse_raw_token(raw_token)
         if token is not None and secret is not None:
-            request.session[self.session_key] = raw_token
+            get_request_token_store().save(request, self, raw_token, token)
         args = {
             'oauth_token': token,
             'oauth_callback': callback,
         }
-
-        scope = self.get_scope(request)
-        if scope:
-            args['scope'] = self.scope_separator.join(self.get_scope(request))
-
+        self.store_requested_scope(request, self.add_scope_args(request, args, granted_scope))
         return args
 
     def parse_raw_token(self, raw_token):
@@ -190,33 +379,62 @@ class OAuthProvider(BaseOAuthProvider):
 
     def request(self, method, url, **kwargs):
         """Build remote url request. Constructs necessary auth."""
-        user_token = kwargs.pop('token', self.token)
-        token, secret, _ = self.parse_raw_token(user_token)
+        if 'auth' not in kwargs:
+            kwargs['auth'] = self.get_signer(lazy.OAuth1, self.get_signature_kwargs(kwargs))
+        return super(OAuthProvider, self).request(method, url, **kwargs)
+
+    def get_token_auth(self, raw_token):
+        return self.get_signer(lazy.OAuth1, self.get_signature_kwargs({'token': raw_token}))
+
+    def get_signer(self, signer_class, signature_kwargs):
+        """
+        Return a ``signer_class`` for ``signature_kwargs``. Signers for API
+        calls are reused; those carrying a one-off callback or verifier are not.
+        """
+        if signature_kwargs.get('verifier') or signature_kwargs.get('callback_uri'):
+            return signer_class(**signature_kwargs)
+        key = (signer_class, self.id) + tuple(sorted(signature_kwargs.items()))
+        signer = signers.get(key)
+        if signer is None:
+            signer = signer_class(**signature_kwargs)
+            signers.set(key, signer)
+        return signer
+
+    def get_signature_kwargs(self, kwargs):
+        """Pop the verifier and callback from request arguments."""
+        user_token = kwargs.get('token', self.token)
+        token, secret = self.get_parsed_token(user_token)
         callback = kwargs.pop('oauth_callback', None)
         verifier = kwargs.get('data', {}).pop('oauth_verifier', None)
-        oauth = OAuth1(
-            resource_owner_key=token,
-            resource_owner_secret=secret,
-            client_key=self.consumer_key,
-            client_secret=self.consumer_secret,
-            verifier=verifier,
-            callback_uri=callback,
-        )
-        kwargs['auth'] = oauth
-        return super(OAuthProvider, self).request(method, url, **kwargs)
+        return {
+            'resource_owner_key': token,
+            'resource_owner_secret': secret,
+            'client_key': self.consumer_key,
+            'client_secret': self.consumer_secret,
+            'verifier': verifier,
+            'callback_uri': callback,
+        }
 
     @property
     def session_key(self):
         return 'connected-accounts-{0}-request-token'.format(self.id)
 
 
-class OAuth2Provider(BaseOAuthProvider):
+class OAuth2Provider(AsyncOAuth2ProviderMixin, BaseOAuthProvider):
     supports_state = True
     expires_in_key = 'expires_in'
     auth_params = {}
+    # Sent instead of ``auth_params`` when only missing scopes are requested.
+    incremental_auth_params = {}
+
+    @property
+    def stateless_state(self):
+        return self.supports_state and settings.CONNECTED_ACCOUNTS_STATELESS_STATE
 
     def check_application_state(self, request):
         """Check optional state parameter."""
+        if self.stateless_state:
+            return use_state(request, self) is not None
         stored = request.session.get(self.session_key, None)
         returned = request.GET.get('state', None)
         check = False
@@ -229,8 +447,8 @@ class OAuth2Provider(BaseOAuthProvider):
             logger.error('No state stored in the sesssion.')
         return check
 
-    def get_access_token(self, request, callback=None):
-        """Fetch access token from callback request."""
+    def get_access_token_kwargs(self, request, callback=None):
+        """Get request arguments to exchange the callback for an access token."""
         callback = request.build_absolute_uri(callback or request.path)
         if not self.check_application_state(request):
             logger.error('Application state check failed.')
@@ -246,35 +464,32 @@ class OAuth2Provider(BaseOAuthProvider):
         else:
             logger.error('No code returned by the provider')
             return None
+        return {'data': args}
+
+    def refresh_access_token(self, raw_token, **kwargs):
+        args = self.get_refresh_token_args(raw_token, **kwargs)
         try:
-            response = self.request('post', self.access_token_url, data=args)
+            response = self.request(
+                'post', self.access_token_url, data=args, operation='refresh_token')
             response.raise_for_status()
-        except RequestException as e:
+        except lazy.RequestException as e:
             logger.error('Unable to fetch access token: {0}'.format(e))
             return None
         else:
             return response.text
 
-    def refresh_access_token(self, raw_token, **kwargs):
-        token, refresh_token, expires_at = self.parse_raw_token(raw_token)
+    def get_refresh_token_args(self, raw_token, **kwargs):
+        """Get request parameters for refreshing an access token."""
+        token, refresh_token = self.get_parsed_token(raw_token)
         refresh_token = kwargs.pop('refresh_token', refresh_token)
 
-        args = {
+        return {
             'client_id': self.consumer_key,
             'client_secret': self.consumer_secret,
             'grant_type': 'refresh_token',
             'refresh_token': refresh_token,
         }
 
-        try:
-            response = self.request('post', self.access_token_url, data=args)
-            response.raise_for_status()
-        except RequestException as e:
-            logger.error('Unable to fetch access token: {0}'.format(e))
-            return None
-        else:
-            return response.text
-
     def get_application_state(self, request, callback):
         """Generate state optional parameter."""
         return get_random_string(32)
@@ -282,7 +497,7 @@ class OAuth2Provider(BaseOAuthProvider):
     def get_auth_params(self, request, action=None):
         return self.auth_params
 
-    def get_redirect_args(self, request, callback):
+    def get_redirect_args(self, request, callback, granted_scope=None):
         """Get request parameters for redirect url."""
         callback = request.build_absolute_uri(callback)
         args = {
@@ -291,18 +506,22 @@ class OAuth2Provider(BaseOAuthProvider):
             'response_type': 'code',
         }
 
-        scope = self.get_scope(request)
-        if scope:
-            args['scope'] = self.scope_separator.join(self.get_scope(request))
-
-        state = self.get_application_state(request, callback)
-        if state is not None:
-            args['state'] = state
-            request.session[self.session_key] = state
+        scope = self.add_scope_args(request, args, granted_scope)
+        if self.stateless_state:
+            # Everything the callback needs travels in the signed state.
+            args['state'] = make_state(request, self, scope)
+        else:
+            self.store_requested_scope(request, scope)
+            state = self.get_application_state(request, callback)
+            if state is not None:
+                args['state'] = state
+                request.session[self.session_key] = state
 
         auth_params = self.get_auth_params(request)
         if auth_params:
             args.update(auth_params)
+        if self.incremental_scope and granted_scope:
+            args.update(self.incremental_auth_params)
 
         return args
 
@@ -328,15 +547,38 @@ class OAuth2Provider(BaseOAuthProvider):
 
         return (token, refresh_token, expires_at)
 
+    def pop_requested_scope(self, request):
+        if not self.stateless_state:
+            return super(OAuth2Provider, self).pop_requested_scope(request)
+        data = load_state(request, self)
+        return data.get('s', '').split() if data is not None else None
+
+    def get_granted_scope(self, request, raw_token):
+        """Return the scopes granted with ``raw_token``, preferring what the provider reports."""
+        requested = super(OAuth2Provider, self).get_granted_scope(request, raw_token)
+        try:
+            scope = json.loads(raw_token).get('scope')
+        except (AttributeError, TypeError, ValueError):
+            scope = parse_qs(raw_token or '').get('scope', [None])[0]
+        if not scope:
+            return requested
+        if isinstance(scope, (list, tuple)):
+            return list(scope)
+        return scope.replace(',', ' ').split()
+
     def request(self, method, url, **kwargs):
         """Build remote url request. Constructs necessary auth."""
-        user_token = kwargs.pop('token', self.token)
-        token, secret, expires_at = self.parse_raw_token(user_token)
+        self.add_access_token(kwargs)
+        return super(OAuth2Provider, self).request(method, url, **kwargs)
+
+    def add_access_token(self, kwargs):
+        """Add the access token for the raw token in request arguments."""
+        user_token = kwargs.get('token', self.token)
+        token, secret = self.get_parsed_token(user_token)
         if token is not None:
             params = kwargs.get('params', {})
             params['access_token'] = token
             kwargs['params'] = params
-        return super(OAuth2Provider, self).request(method, url, **kwargs)
 
     @property
     def session_key(self):
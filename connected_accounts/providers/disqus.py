@@ -1,8 +1,6 @@
-import json
 import logging
 
 from django.utils.translation import ugettext_lazy as _
-from requests import RequestException
 
 from connected_accounts.conf import settings
 from connected_accounts.provider_pool import providers
@@ -49,22 +47,15 @@ class DisqusProvider(OAuth2Provider):
     consumer_secret = settings.CONNECTED_ACCOUNTS_DISQUS_CONSUMER_SECRET
     scope = settings.CONNECTED_ACCOUNTS_DISQUS_SCOPE
 
-    def get_profile_data(self, raw_token):
-        """Fetch user profile information."""
-        token_data = json.loads(raw_token)
+    def get_profile_request_kwargs(self, raw_token):
+        """Get request arguments for fetching user profile information."""
+        token, _ = self.get_parsed_token(raw_token)
         params = {
-            'access_token': token_data['access_token'],
+            'access_token': token,
             'api_key': self.consumer_key,
-            'api_secret': token_data['access_token']
+            'api_secret': token
         }
-        try:
-            response = self.request('get', self.profile_url, params=params)
-            response.raise_for_status()
-        except RequestException as e:
-            logger.error('Unable to fetch user profile: {0}'.format(e))
-            return None
-        else:
-            return response.json() or response.text
+        return {'params': params}
 
     def extract_uid(self, data):
         """Return unique identifier from the profile info."""
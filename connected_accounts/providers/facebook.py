@@ -43,5 +43,7 @@ class FacebookProvider(OAuth2Provider):
     consumer_secret = settings.CONNECTED_ACCOUNTS_FACEBOOK_CONSUMER_SECRET
     scope = settings.CONNECTED_ACCOUNTS_FACEBOOK_SCOPE
     auth_params = settings.CONNECTED_ACCOUNTS_FACEBOOK_AUTH_PARAMS
+    # Permissions granted to the app are kept when more are requested.
+    incremental_scope = True
 
 providers.register(FacebookProvider)
@@ -41,6 +41,8 @@ class GoogleProvider(OAuth2Provider):
     consumer_secret = settings.CONNECTED_ACCOUNTS_GOOGLE_CONSUMER_SECRET
     scope = settings.CONNECTED_ACCOUNTS_GOOGLE_SCOPE
     auth_params = settings.CONNECTED_ACCOUNTS_GOOGLE_AUTH_PARAMS
+    incremental_scope = True
+    incremental_auth_params = {'include_granted_scopes': 'true'}
 
 
 providers.register(GoogleProvider)
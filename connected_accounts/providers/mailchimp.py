@@ -1,8 +1,6 @@
-import json
 import logging
 
 from django.utils.translation import ugettext_lazy as _
-from requests.exceptions import RequestException
 
 from connected_accounts.conf import settings
 from connected_accounts.provider_pool import providers
@@ -46,20 +44,11 @@ class MailChimpProvider(OAuth2Provider):
         """Return unique identifier from the profile info."""
         return data.get('user_id', None)
 
-    def get_profile_data(self, raw_token):
-        """Fetch user profile information."""
-        token_data = json.loads(raw_token)
+    def get_profile_request_kwargs(self, raw_token):
+        """Get request arguments for fetching user profile information."""
+        token, _ = self.get_parsed_token(raw_token)
         # This header is the 'magic' that makes this empty GET request work.
-        headers = {'Authorization': 'OAuth %s' % token_data['access_token']}
-
-        try:
-            response = self.request('get', self.profile_url, headers=headers)
-            response.raise_for_status()
-        except RequestException as e:
-            logger.error('Unable to fetch user profile: {0}'.format(e))
-            return None
-        else:
-            return response.json() or response.text
+        return {'headers': {'Authorization': 'OAuth %s' % token}}
 
 
 providers.register(MailChimpProvider)
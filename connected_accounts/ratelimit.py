@@ -0,0 +1,224 @@
+"""
+Client-side rate limiting for provider APIs.
+
+Limits are configured per provider as ``(requests, seconds)``::
+
+    CONNECTED_ACCOUNTS_RATE_LIMITS = {'twitter': (180, 900)}
+
+Each process keeps a token bucket per provider (or per provider and access
+token). With ``CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED`` the counts live in the
+Django cache instead, so every worker draws from the same budget. For
+providers with a limit, responses that carry ``Retry-After`` or rate-limit
+headers pause further calls until the quota resets: calls made with the
+same access token, or to the same OAuth handshake endpoint, as the
+response that asked for it.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_http_date_safe
+from requests.exceptions import RequestException
+
+from .cache import get_cache
+from .conf import settings
+
+logger = logging.getLogger('connected_accounts')
+
+REMAINING_HEADERS = ('X-Rate-Limit-Remaining', 'X-RateLimit-Remaining', 'RateLimit-Remaining')
+RESET_HEADERS = ('X-Rate-Limit-Reset', 'X-RateLimit-Reset', 'RateLimit-Reset')
+USAGE_HEADERS = ('X-App-Usage', 'X-Ad-Account-Usage')
+
+# Paused on their own, so API quotas never hold up logging in.
+HANDSHAKE_OPERATIONS = ('request_token', 'access_token')
+
+
+class RateLimitExceeded(RequestException):
+    """Raised instead of calling a provider that is over its rate limit."""
+
+    def __init__(self, provider_id, retry_after):
+        self.provider_id = provider_id
+        self.retry_after = retry_after
+        super(RateLimitExceeded, self).__init__(
+            'Rate limit for {0} exceeded, retry in {1:.1f}s'.format(provider_id, retry_after))
+
+
+def get_header(headers, names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def get_retry_after(response, now=None):
+    """
+    Return how many seconds to hold off calling the provider that sent
+    ``response``, or ``None`` if it did not ask us to.
+    """
+    now = time.time() if now is None else now
+    headers = response.headers
+
+    retry_after = headers.get('Retry-After')
+    if retry_after and response.status_code in (429, 503):
+        try:
+            return max(0, int(retry_after))
+        except ValueError:
+            retry_at = parse_http_date_safe(retry_after)
+            if retry_at is not None:
+                return max(0, retry_at - now)
+
+    remaining = get_header(headers, REMAINING_HEADERS)
+    reset = get_header(headers, RESET_HEADERS)
+    if remaining is not None and reset is not None:
+        try:
+            remaining, reset = int(remaining), int(reset)
+        except ValueError:
+            pass
+        else:
+            if remaining <= 0:
+                # Twitter and GitHub send an epoch time, the IETF draft a delay.
+                return max(0, reset - now) if reset > now / 2 else reset
+
+    # Facebook reports usage as percentages of the quota.
+    usage = get_header(headers, USAGE_HEADERS)
+    if usage:
+        try:
+            usage = json.loads(usage)
+        except ValueError:
+            usage = {}
+        if any(value >= 100 for value in usage.values() if isinstance(value, (int, float))):
+            return settings.CONNECTED_ACCOUNTS_RATE_LIMIT_BACKOFF
+
+    if response.status_code == 429:
+        return settings.CONNECTED_ACCOUNTS_RATE_LIMIT_BACKOFF
+    return None
+
+
+class TokenBucket(object):
+    """Allows ``capacity`` calls at once, refilled at ``rate`` calls per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Take a token; returns 0, or the seconds to wait if none is left."""
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class RateLimiter(object):
+
+    def __init__(self):
+        self.buckets = {}
+        self.blocked = {}
+        self.lock = threading.Lock()
+
+    def get_limit(self, provider_id):
+        return settings.CONNECTED_ACCOUNTS_RATE_LIMITS.get(provider_id)
+
+    def get_key(self, provider, token=None):
+        key = provider.id
+        if settings.CONNECTED_ACCOUNTS_RATE_LIMIT_PER_TOKEN and token:
+            key = '{0}:{1}'.format(key, hashlib.sha1(force_bytes(token)).hexdigest())
+        return key
+
+    def get_pause_key(self, provider, token=None, operation=None):
+        """Key of the pause a response to this call sets, and the call waits for."""
+        if operation in HANDSHAKE_OPERATIONS:
+            return '{0}:{1}'.format(provider.id, operation)
+        if token:
+            return '{0}:{1}'.format(provider.id, hashlib.sha1(force_bytes(token)).hexdigest())
+        return provider.id
+
+    def get_wait(self, provider, token=None, operation=None):
+        """
+        Reserve a call to ``provider``. Returns 0 when it may go ahead, or
+        the seconds to wait before trying again. Raises ``RateLimitExceeded``
+        if that is longer than ``CONNECTED_ACCOUNTS_RATE_LIMIT_MAX_WAIT``.
+        """
+        limit = self.get_limit(provider.id)
+        if limit is None:
+            return 0
+        wait = self.get_blocked_until(self.get_pause_key(provider, token, operation)) - time.time()
+        if wait <= 0:
+            wait = self.reserve(self.get_key(provider, token), limit)
+        if wait > settings.CONNECTED_ACCOUNTS_RATE_LIMIT_MAX_WAIT:
+            raise RateLimitExceeded(provider.id, wait)
+        return max(0, wait)
+
+    def acquire(self, provider, token=None, operation=None):
+        """Block until a call to ``provider`` is allowed."""
+        wait = self.get_wait(provider, token, operation)
+        while wait:
+            time.sleep(wait)
+            wait = self.get_wait(provider, token, operation)
+
+    def reserve(self, key, limit):
+        if limit is None:
+            return 0
+        requests, period = limit
+        if settings.CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED:
+            return self.reserve_shared(key, requests, period)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.setdefault(key, TokenBucket(requests, float(requests) / period))
+        return bucket.take()
+
+    def reserve_shared(self, key, requests, period):
+        """Fixed-window counter in the cache, which ``incr`` keeps atomic across workers."""
+        cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+        now = time.time()
+        window = int(now // period)
+        cache_key = 'connected_accounts:ratelimit:{0}:{1}'.format(key, window)
+        cache.add(cache_key, 0, period + 1)
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:
+            # Expired between add() and incr().
+            cache.set(cache_key, 1, period + 1)
+            count = 1
+        if count <= requests:
+            return 0
+        return (window + 1) * period - now
+
+    def get_blocked_until(self, key):
+        if settings.CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED:
+            cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+            return cache.get('connected_accounts:ratelimit-blocked:{0}'.format(key), 0)
+        return self.blocked.get(key, 0)
+
+    def update(self, provider, response, token=None, operation=None):
+        """Pause calls like this one if ``response`` says their quota is used up."""
+        if self.get_limit(provider.id) is None:
+            return
+        retry_after = get_retry_after(response)
+        if not retry_after:
+            return
+        key = self.get_pause_key(provider, token, operation)
+        until = time.time() + retry_after
+        logger.warning('Rate limited by {0}, pausing calls for {1:.1f}s'.format(provider.id, retry_after))
+        if settings.CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED:
+            cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+            cache.set('connected_accounts:ratelimit-blocked:{0}'.format(key), until, int(retry_after) + 1)
+        else:
+            with self.lock:
+                self.blocked[key] = max(until, self.blocked.get(key, 0))
+
+rate_limiter = RateLimiter()
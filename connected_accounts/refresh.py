@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .conf import settings
+from .models import Account
+
+logger = logging.getLogger('connected_accounts')
+
+
+class TokenRefresher(object):
+    """
+    Refresh OAuth2 access tokens shortly before they expire.
+
+    Accounts are claimed in batches by leasing them for ``lease`` seconds in a
+    short transaction, with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+    database supports it, so several processes can sweep the same table
+    without refreshing the same account twice. The tokens are then refreshed
+    outside that transaction. A successful refresh releases the lease; after
+    a failure it is extended, doubling with every failure in a row.
+    """
+
+    def __init__(self, window=None, batch_size=None, workers=None,
+                 provider_ids=None, lease=None, using=DEFAULT_DB_ALIAS):
+        self.window = window or settings.CONNECTED_ACCOUNTS_REFRESH_WINDOW
+        self.lease = lease or settings.CONNECTED_ACCOUNTS_REFRESH_LEASE
+        self.batch_size = batch_size or settings.CONNECTED_ACCOUNTS_REFRESH_BATCH_SIZE
+        self.workers = workers or settings.CONNECTED_ACCOUNTS_REFRESH_WORKERS
+        self.provider_ids = provider_ids
+        self.using = using
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.cursor = 0
+        self.results = {'refreshed': 0, 'failed': 0}
+        self.failed = []
+
+    def get_queryset(self):
+        """Accounts with a refresh token that expire within the window."""
+        deadline = timezone.now() + timedelta(seconds=self.window)
+        queryset = Account.objects.using(self.using).filter(
+            expires_at__isnull=False, expires_at__lte=deadline,
+        ).exclude(oauth_token_secret__isnull=True).exclude(oauth_token_secret='')
+        if self.provider_ids:
+            queryset = queryset.filter(provider__in=self.provider_ids)
+        return queryset
+
+    def claim_batch(self):
+        """Lease and return the next batch of accounts to refresh."""
+        features = connections[self.using].features
+        now = timezone.now()
+        queryset = self.get_queryset().filter(
+            Q(refresh_leased_until__isnull=True) | Q(refresh_leased_until__lte=now))
+        if getattr(features, 'has_select_for_update_skip_locked', False):
+            queryset = queryset.select_for_update(skip_locked=True)
+        else:
+            queryset = queryset.select_for_update()
+
+        with transaction.atomic(using=self.using):
+            with self.lock:
+                batch = list(queryset.filter(pk__gt=self.cursor).order_by('pk')[:self.batch_size])
+                if batch:
+                    self.cursor = batch[-1].pk
+            if batch:
+                Account.objects.using(self.using).filter(pk__in=[account.pk for account in batch]) \
+                    .update(refresh_leased_until=now + timedelta(seconds=self.lease))
+        return batch
+
+    def refresh(self, account):
+        try:
+            refreshed = account.refresh_access_token()
+        except Exception:
+            logger.exception('Unable to refresh access token for account %s', account.pk)
+            refreshed = False
+
+        if not refreshed:
+            self.back_off(account)
+
+        with self.lock:
+            if refreshed:
+                self.results['refreshed'] += 1
+            else:
+                self.results['failed'] += 1
+                self.failed.append(account.pk)
+
+    def back_off(self, account):
+        """Keep ``account`` leased for longer after each failed refresh."""
+        failures = account.refresh_failures + 1
+        delay = min(self.lease * 2 ** failures, settings.CONNECTED_ACCOUNTS_REFRESH_BACKOFF_MAX)
+        Account.objects.using(self.using).filter(pk=account.pk).update(
+            refresh_failures=failures,
+            refresh_leased_until=timezone.now() + timedelta(seconds=delay))
+
+    def work(self):
+        """Claim and refresh batches until there is nothing left to do."""
+        while True:
+            batch = self.claim_batch()
+            if not batch:
+                return
+            for account in batch:
+                self.refresh(account)
+
+    def run_worker(self):
+        try:
+            self.work()
+        finally:
+            connections[self.using].close()
+
+    def run(self):
+        """Run a single sweep and return a summary of the results."""
+        self.reset()
+        if self.workers <= 1:
+            self.work()
+        else:
+            threads = [threading.Thread(target=self.run_worker) for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        logger.info('Refreshed {refreshed} access token(s), {failed} failed.'.format(**self.results))
+        return dict(self.results)
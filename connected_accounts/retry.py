@@ -0,0 +1,158 @@
+"""
+Retries and circuit breaking for provider calls.
+
+Idempotent calls that fail with a connection error, a timeout or one of
+``CONNECTED_ACCOUNTS_RETRY_STATUSES`` are retried with jittered exponential
+backoff. Every call goes through a per-provider circuit breaker: after
+``CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_THRESHOLD`` consecutive failures calls
+fail fast with ``CircuitOpenError`` for
+``CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_TIMEOUT`` seconds, then a single trial
+call decides whether the provider is back.
+"""
+from __future__ import unicode_literals
+
+import logging
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectionError, RequestException, Timeout
+
+from .conf import settings
+
+logger = logging.getLogger('connected_accounts')
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', )
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of calling a provider that keeps failing."""
+
+    def __init__(self, provider_id, retry_after):
+        self.provider_id = provider_id
+        self.retry_after = retry_after
+        super(CircuitOpenError, self).__init__(
+            'Calls to {0} are suspended for {1:.1f}s after repeated failures'.format(
+                provider_id, retry_after))
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, provider_id, threshold, reset_timeout):
+        self.provider_id = provider_id
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before_call(self):
+        """Raise ``CircuitOpenError`` unless a call may be made now."""
+        if self.opened_at is None:
+            return
+        with self.lock:
+            if self.opened_at is None:
+                return
+            retry_after = self.opened_at + self.reset_timeout - time.time()
+            if retry_after <= 0 and not self.trial:
+                self.trial = True
+                return
+            raise CircuitOpenError(self.provider_id, max(0, retry_after))
+
+    def record_success(self):
+        if self.failures or self.opened_at is not None:
+            with self.lock:
+                self.failures = 0
+                self.opened_at = None
+                self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial:
+                    logger.warning('Suspending calls to {0} for {1}s after {2} failure(s)'.format(
+                        self.provider_id, self.reset_timeout, self.failures))
+                self.opened_at = time.time()
+            self.trial = False
+
+    def release(self):
+        """End a trial call that neither succeeded nor failed upstream."""
+        with self.lock:
+            self.trial = False
+
+
+class BreakerPool(object):
+
+    def __init__(self):
+        self.breaker_map = {}
+        self.lock = threading.Lock()
+
+    def get(self, provider_id):
+        breaker = self.breaker_map.get(provider_id)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breaker_map.get(provider_id)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        provider_id,
+                        settings.CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_THRESHOLD,
+                        settings.CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_TIMEOUT)
+                    self.breaker_map[provider_id] = breaker
+        return breaker
+
+    def reset(self):
+        with self.lock:
+            self.breaker_map = {}
+
+breakers = BreakerPool()
+
+
+def get_backoff(attempt):
+    """Full-jitter exponential backoff for the given (0-based) retry."""
+    ceiling = min(settings.CONNECTED_ACCOUNTS_RETRY_BACKOFF_MAX,
+                  settings.CONNECTED_ACCOUNTS_RETRY_BACKOFF * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def get_attempts(retry):
+    return settings.CONNECTED_ACCOUNTS_RETRIES + 1 if retry else 1
+
+
+def is_retryable_status(status_code):
+    return status_code in settings.CONNECTED_ACCOUNTS_RETRY_STATUSES
+
+
+def call(provider_id, send, retry=False):
+    """
+    Call ``send()`` through the provider's circuit breaker, retrying
+    transient failures when ``retry`` is set. Returns the last response.
+    """
+    breaker = breakers.get(provider_id)
+    attempts = get_attempts(retry)
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            response = send()
+        except (ConnectionError, Timeout) as e:
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                raise
+            logger.info('Retrying {0} call after error: {1}'.format(provider_id, e))
+        except Exception:
+            breaker.release()
+            raise
+        else:
+            if not is_retryable_status(response.status_code):
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                return response
+            logger.info('Retrying {0} call after HTTP {1}'.format(provider_id, response.status_code))
+        time.sleep(get_backoff(attempt))
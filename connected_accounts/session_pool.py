@@ -0,0 +1,92 @@
+from __future__ import unicode_literals
+
+import os
+import threading
+
+from .conf import settings
+
+
+class BlockAllCookies(object):
+    """
+    A cookie policy that never stores or sends cookies on a shared session.
+
+    It implements the ``http.cookiejar.CookiePolicy`` interface instead of
+    subclassing it, as importing ``http.cookiejar`` would make loading the
+    providers pull in much of the HTTP stack.
+    """
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class SessionPool(object):
+    """
+    Hands out one keep-alive ``requests.Session`` per provider so token
+    exchanges, refreshes and profile fetches reuse open connections instead
+    of paying a new TCP/TLS handshake on every call.
+    """
+
+    def __init__(self):
+        self.session_map = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def get_session(self, provider_id):
+        self.check_pid()
+        session = self.session_map.get(provider_id)
+        if session is None:
+            with self.lock:
+                session = self.session_map.get(provider_id)
+                if session is None:
+                    session = self.create_session(provider_id)
+                    self.session_map[provider_id] = session
+        return session
+
+    def create_session(self, provider_id):
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+
+        session = Session()
+        # Sessions are shared by every account of a provider, so cookies
+        # set for one account must never leak into requests for another.
+        session.cookies.set_policy(BlockAllCookies())
+        adapter = HTTPAdapter(
+            pool_connections=settings.CONNECTED_ACCOUNTS_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.CONNECTED_ACCOUNTS_HTTP_POOL_MAXSIZE,
+            pool_block=settings.CONNECTED_ACCOUNTS_HTTP_POOL_BLOCK,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get_timeout(self, provider_id):
+        timeouts = settings.CONNECTED_ACCOUNTS_HTTP_TIMEOUTS
+        return timeouts.get(provider_id, settings.CONNECTED_ACCOUNTS_HTTP_TIMEOUT)
+
+    def check_pid(self):
+        """Drop sessions inherited from a parent process after a fork."""
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.session_map = {}
+                    self.pid = os.getpid()
+
+    def close(self):
+        with self.lock:
+            for session in self.session_map.values():
+                session.close()
+            self.session_map = {}
+
+sessions = SessionPool()
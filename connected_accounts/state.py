@@ -0,0 +1,80 @@
+"""
+Signed OAuth2 ``state`` values, so redirects need not write to the session.
+
+With ``CONNECTED_ACCOUNTS_STATELESS_STATE`` the state sent to the provider
+is a time-limited token signed with ``SECRET_KEY`` and salted with the
+user (or session) it was issued to. It carries a random nonce, which is
+recorded in the cache when the state is used, so each state is accepted
+once within ``CONNECTED_ACCOUNTS_STATE_MAX_AGE`` seconds.
+"""
+from __future__ import unicode_literals
+
+import logging
+
+from django.core import signing
+from django.utils.crypto import get_random_string
+
+from .cache import get_cache
+from .conf import settings
+
+logger = logging.getLogger('connected_accounts')
+
+SALT = 'connected_accounts.state'
+
+
+def get_binding(request):
+    """Identify who the state is issued to: the user, or else the session."""
+    user = getattr(request, 'user', None)
+    is_authenticated = getattr(user, 'is_authenticated', False)
+    if callable(is_authenticated):
+        # Django < 1.10
+        is_authenticated = is_authenticated()
+    if is_authenticated:
+        return 'user:{0}'.format(user.pk)
+    session = getattr(request, 'session', None)
+    return 'session:{0}'.format(getattr(session, 'session_key', None) or '')
+
+
+def get_salt(request, provider):
+    return '{0}:{1}:{2}'.format(SALT, provider.id, get_binding(request))
+
+
+def make_state(request, provider, scope=None):
+    """Return a signed state for a redirect to ``provider``."""
+    data = {'n': get_random_string(16)}
+    if scope:
+        data['s'] = ' '.join(scope)
+    return signing.dumps(data, salt=get_salt(request, provider), compress=True)
+
+
+def load_state(request, provider):
+    """Return the data in the callback's signed state, or ``None`` if invalid."""
+    state = request.GET.get('state', None)
+    if not state:
+        return None
+    try:
+        return signing.loads(
+            state, salt=get_salt(request, provider),
+            max_age=settings.CONNECTED_ACCOUNTS_STATE_MAX_AGE)
+    except signing.SignatureExpired:
+        logger.error('State returned by {0} has expired.'.format(provider.id))
+    except signing.BadSignature:
+        logger.error('State returned by {0} has a bad signature.'.format(provider.id))
+    return None
+
+
+def use_state(request, provider):
+    """
+    Check the callback's signed state and record its nonce as used.
+    Returns the state's data, or ``None`` if it is invalid or was used before.
+    """
+    data = load_state(request, provider)
+    if data is None:
+        return None
+    cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+    key = 'connected_accounts:state-nonce:{0}:{1}'.format(provider.id, data.get('n'))
+    # ``add`` is atomic, so of two callbacks with the same state only one wins.
+    if not cache.add(key, 1, settings.CONNECTED_ACCOUNTS_STATE_MAX_AGE + 1):
+        logger.error('State returned by {0} was already used.'.format(provider.id))
+        return None
+    return data
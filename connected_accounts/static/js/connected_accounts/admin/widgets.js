@@ -1,4 +1,36 @@
 (function($) {
+  // Lookups requested in the same tick are sent to the batch JSON endpoint
+  // as a single request.
+  var pending = {},
+    timer = null;
+
+  function fetchAccount(batchUrl, id, callback) {
+    if (!pending.hasOwnProperty(batchUrl)) {
+      pending[batchUrl] = {};
+    }
+    (pending[batchUrl][id] = pending[batchUrl][id] || []).push(callback);
+
+    if (timer === null) {
+      timer = setTimeout(flush, 0);
+    }
+  }
+
+  function flush() {
+    var batches = pending;
+    pending = {};
+    timer = null;
+
+    $.each(batches, function(batchUrl, callbacks) {
+      $.getJSON(batchUrl, {ids: $.map(callbacks, function(_, id) { return id; }).join(',')}, function(data) {
+        $.each(callbacks, function(id, fns) {
+          $.each(fns, function(i, fn) { fn(data[id]); });
+        });
+      }).fail(function() {
+        alert('Sorry, something unexpected has happened. Please reload this page and try again.');
+      });
+    });
+  }
+
   $(document).ready(function() {
     $('.account-widget').each(function() {
       var that = $(this),
@@ -15,37 +47,38 @@
         thumbnail.attr('src', el.data('icon'));
         description.html(el.data('description'));
       });
+    });
+
+    var _dismissRelatedLookupPopup = window.dismissRelatedLookupPopup;
+
+    window.dismissRelatedLookupPopup = function(win, chosenId) {
+      var name = windowname_to_id(win.name),
+        el = $('#' + name);
+
+      if (!el.hasClass('vAccountRawIdWidget')) {
+        _dismissRelatedLookupPopup(win, chosenId);
+        return;
+      }
 
-      var _dismissRelatedLookupPopup = window.dismissRelatedLookupPopup;
-
-      window.dismissRelatedLookupPopup = function(win, chosenId) {
-        var name = windowname_to_id(win.name),
-          el = $('#' + name);
-
-        if (!el.hasClass('vAccountRawIdWidget')) {
-          _dismissRelatedLookupPopup(win, chosenId);
-        } else {
-          var oldValue = el.val();
-          el.val(chosenId);
-          win.close();
-
-          if (oldValue != chosenId) {
-            var url = that.data('ajaxurl').replace('_id_', chosenId);
-            $.getJSON(url, function(data) {
-              el.data('account', data);
-              if (data.hasOwnProperty('avatar_url')) {
-                thumbnail.attr('src', data['avatar_url']);
-              }
-              description.html(data['provider_name'] + ' &mdash; ' + data['account']);
-              clearBtn.show();
-            }).error(function() {
-              alert('Sorry, something unexpected has happened. Please reload this page and try again.');
-            }).done(function() {
-              el.trigger('change');
-            });
+      var oldValue = el.val();
+      el.val(chosenId);
+      win.close();
+
+      if (oldValue != chosenId) {
+        var that = el.closest('.account-widget');
+        fetchAccount(that.data('batchurl'), chosenId, function(data) {
+          if (data === undefined) {
+            return;
           }
-        }
-      };
-    });
+          el.data('account', data);
+          if (data.hasOwnProperty('avatar_url')) {
+            that.find('.thumbnail').attr('src', data['avatar_url']);
+          }
+          that.find('.description').html(data['provider_name'] + ' &mdash; ' + data['account']);
+          that.find('.clear').show();
+          el.trigger('change');
+        });
+      }
+    };
   });
 })(django.jQuery);
@@ -0,0 +1,172 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import invalidate_account_json
+from .conf import settings
+from .models import COMMON_FIELDS, Account
+
+try:
+    from queue import Empty, Queue
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from Queue import Empty, Queue
+
+logger = logging.getLogger('connected_accounts')
+
+
+class ProfileSync(object):
+    """
+    Re-fetch profile data (``extra_data``) for many accounts at once.
+
+    Accounts are streamed from the database, their profiles are fetched
+    concurrently by a bounded pool of worker threads (with an optional cap
+    per provider) and the results are written back in batches.
+    """
+
+    def __init__(self, provider_ids=None, older_than=None, workers=None,
+                 batch_size=None, provider_concurrency=None, progress=None):
+        self.provider_ids = provider_ids
+        self.older_than = older_than
+        self.workers = workers or settings.CONNECTED_ACCOUNTS_SYNC_WORKERS
+        self.batch_size = batch_size or settings.CONNECTED_ACCOUNTS_SYNC_BATCH_SIZE
+        if provider_concurrency is None:
+            provider_concurrency = settings.CONNECTED_ACCOUNTS_SYNC_PROVIDER_CONCURRENCY
+        self.semaphores = dict(
+            (provider_id, threading.BoundedSemaphore(limit))
+            for provider_id, limit in provider_concurrency.items())
+        self.progress = progress
+        self.reset()
+
+    def reset(self):
+        self.pending = []
+        self.started = time.time()
+        self.results = {'processed': 0, 'updated': 0, 'failed': 0}
+
+    def get_queryset(self):
+        queryset = Account.objects.all()
+        if self.provider_ids:
+            queryset = queryset.filter(provider__in=self.provider_ids)
+        if self.older_than is not None:
+            # Logging in fetches the profile too.
+            cutoff = timezone.now() - self.older_than
+            queryset = queryset.filter(last_login__lt=cutoff).filter(
+                Q(synced_at__isnull=True) | Q(synced_at__lt=cutoff))
+        return queryset.order_by('pk')
+
+    def fetch(self, account):
+        """Fetch fresh profile data for ``account``; returns False on failure."""
+        semaphore = self.semaphores.get(account.provider)
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if account.is_expired:
+                account.refresh_access_token()
+            provider = account.get_provider()
+            profile_data = provider.get_profile_data(account.raw_token)
+            if profile_data is None:
+                return False
+            account.extra_data = provider.extract_extra_data(profile_data)
+            account.synced_at = timezone.now()
+            return True
+        except Exception:
+            logger.exception('Unable to sync profile for account %s', account.pk)
+            return False
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def collect(self, account, updated):
+        self.results['processed'] += 1
+        if updated:
+            self.pending.append(account)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        else:
+            self.results['failed'] += 1
+
+    def flush(self):
+        """Write fetched profiles back to the database."""
+        if not self.pending:
+            return
+        fields = ['extra_data', 'synced_at'] + list(COMMON_FIELDS)
+        for account in self.pending:
+            account.update_common_fields()
+        if hasattr(Account.objects, 'bulk_update'):
+            Account.objects.bulk_update(self.pending, fields)
+        else:  # pragma: no cover
+            # Django < 2.2
+            for account in self.pending:
+                Account.objects.filter(pk=account.pk).update(
+                    **dict((field, getattr(account, field)) for field in fields))
+        # Neither path sends post_save, which drops the cached account JSON.
+        for account in self.pending:
+            invalidate_account_json(Account, account)
+        self.results['updated'] += len(self.pending)
+        self.pending = []
+        if self.progress is not None:
+            self.progress(self.get_stats())
+
+    def get_stats(self):
+        stats = dict(self.results)
+        stats['elapsed'] = time.time() - self.started
+        stats['rate'] = stats['processed'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        return stats
+
+    def work(self, tasks, results):
+        try:
+            while True:
+                account = tasks.get()
+                if account is None:
+                    return
+                results.put((account, self.fetch(account)))
+        finally:
+            connection.close()
+
+    def drain(self, results):
+        while True:
+            try:
+                account, updated = results.get(block=False)
+            except Empty:
+                return
+            self.collect(account, updated)
+
+    def run(self):
+        """Sync every matching account and return the final statistics."""
+        self.reset()
+        accounts = self.get_queryset().iterator()
+
+        if self.workers <= 1:
+            for account in accounts:
+                self.collect(account, self.fetch(account))
+        else:
+            # A bounded task queue keeps the iterator from racing ahead of
+            # the workers, so memory use does not grow with the table size.
+            tasks = Queue(self.workers * 2)
+            results = Queue()
+            threads = [threading.Thread(target=self.work, args=(tasks, results))
+                       for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            try:
+                for account in accounts:
+                    tasks.put(account)
+                    self.drain(results)
+            finally:
+                # Stop the workers even if reading or writing accounts failed.
+                for thread in threads:
+                    tasks.put(None)
+                for thread in threads:
+                    thread.join()
+            self.drain(results)
+
+        self.flush()
+        stats = self.get_stats()
+        logger.info('Synced {updated} of {processed} profile(s), {failed} failed.'.format(**stats))
+        return stats
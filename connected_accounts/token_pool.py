@@ -0,0 +1,99 @@
+"""
+OAuth 1.0 request tokens fetched ahead of time.
+
+With ``CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL`` on, each provider keeps up to
+``CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_SIZE`` unused request tokens per
+callback url, so a redirect can send the user on without waiting for the
+provider. Taking a token starts a background refill; tokens older than
+``CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_TTL`` seconds are thrown away, so
+set it below the provider's own lifetime for request tokens. When the pool
+is empty the redirect fetches a token itself, as it does without the pool.
+"""
+from __future__ import unicode_literals
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from .conf import settings
+
+logger = logging.getLogger('connected_accounts')
+
+
+class RequestTokenPool(object):
+
+    def __init__(self):
+        # (provider id, callback) -> deque of (expires, raw_token)
+        self.token_map = {}
+        self.refilling = set()
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def get(self, provider, callback):
+        """Take an unexpired request token for ``callback``, or ``None``."""
+        key = (provider.id, callback)
+        raw_token = None
+        with self.lock:
+            self.check_pid()
+            tokens = self.get_tokens(key)
+            if tokens:
+                raw_token = tokens.popleft()[1]
+        logger.debug('Request token pool {0} for {1}'.format(
+            'hit' if raw_token is not None else 'miss', provider.id))
+        self.start_refill(provider, callback)
+        return raw_token
+
+    def get_tokens(self, key):
+        """Return the unexpired tokens for ``key``. Call with the lock held."""
+        tokens = self.token_map.setdefault(key, deque())
+        now = time.time()
+        while tokens and tokens[0][0] <= now:
+            tokens.popleft()
+        return tokens
+
+    def start_refill(self, provider, callback):
+        key = (provider.id, callback)
+        with self.lock:
+            if key in self.refilling or \
+                    len(self.get_tokens(key)) >= settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_SIZE:
+                return
+            self.refilling.add(key)
+        thread = threading.Thread(target=self.refill, args=(provider, callback))
+        thread.daemon = True
+        thread.start()
+
+    def refill(self, provider, callback):
+        """Fetch request tokens for ``callback`` until the pool is full."""
+        key = (provider.id, callback)
+        size = settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_SIZE
+        try:
+            # Bounded, in case tokens expire as fast as they are fetched.
+            for _ in range(size):
+                with self.lock:
+                    count = len(self.get_tokens(key))
+                if count >= size:
+                    break
+                raw_token = provider.fetch_request_token(callback)
+                if raw_token is None:
+                    break
+                expires = time.time() + settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_TTL
+                with self.lock:
+                    self.get_tokens(key).append((expires, raw_token))
+        finally:
+            with self.lock:
+                self.refilling.discard(key)
+
+    def check_pid(self):
+        """Drop tokens inherited from a parent process. Call with the lock held."""
+        if self.pid != os.getpid():
+            self.token_map = {}
+            self.refilling = set()
+            self.pid = os.getpid()
+
+    def clear(self):
+        with self.lock:
+            self.token_map = {}
+
+request_token_pool = RequestTokenPool()
@@ -0,0 +1,86 @@
+"""
+Where OAuth 1.0 request tokens wait between the redirect and the callback.
+
+The default, ``SessionRequestTokenStore``, keeps them in the session.
+``CacheRequestTokenStore`` keeps them in the Django cache named by
+``CONNECTED_ACCOUNTS_CACHE`` for ``CONNECTED_ACCOUNTS_REQUEST_TOKEN_TTL``
+seconds, so abandoned logins expire on their own and the redirect does
+not write to the session; the cache must be shared by every worker that
+can receive the callback. Set ``CONNECTED_ACCOUNTS_REQUEST_TOKEN_STORE`` to
+the dotted path of either, or of a subclass of ``RequestTokenStore``.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+
+from django.utils.encoding import force_bytes
+
+from .cache import get_cache, import_string
+from .conf import settings
+from .state import get_binding
+
+logger = logging.getLogger('connected_accounts')
+
+
+class RequestTokenStore(object):
+
+    def save(self, request, provider, raw_token, token):
+        """Keep ``raw_token``, whose ``oauth_token`` is ``token``, for the callback."""
+        raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
+
+    def consume(self, request, provider, token):
+        """Return the raw request token for ``token`` and forget it, or ``None``."""
+        raise NotImplementedError('Defined in a sub-class')  # pragma: no cover
+
+
+class SessionRequestTokenStore(RequestTokenStore):
+
+    def save(self, request, provider, raw_token, token):
+        request.session[provider.session_key] = raw_token
+
+    def consume(self, request, provider, token):
+        return request.session.pop(provider.session_key, None)
+
+
+class CacheRequestTokenStore(RequestTokenStore):
+
+    def get_key(self, provider, token):
+        digest = hashlib.sha256(force_bytes(token)).hexdigest()
+        return 'connected_accounts:request-token:{0}:{1}'.format(provider.id, digest)
+
+    def save(self, request, provider, raw_token, token):
+        cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+        cache.set(self.get_key(provider, token), (get_binding(request), raw_token),
+                  settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_TTL)
+
+    def consume(self, request, provider, token):
+        if not token:
+            return None
+        cache = get_cache(settings.CONNECTED_ACCOUNTS_CACHE)
+        key = self.get_key(provider, token)
+        value = cache.get(key)
+        if value is None:
+            logger.error('Request token for {0} is unknown or has expired.'.format(provider.id))
+            return None
+        binding, raw_token = value
+        # Checked first, so presenting someone else's token doesn't use it up.
+        if binding != get_binding(request):
+            logger.error('Request token for {0} was issued to someone else.'.format(provider.id))
+            return None
+        # ``add`` is atomic, so of two callbacks for one token only one gets it.
+        if not cache.add(key + ':consumed', 1, settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_TTL):
+            logger.error('Request token for {0} was already used.'.format(provider.id))
+            return None
+        cache.delete(key)
+        return raw_token
+
+
+request_token_stores = {}
+
+
+def get_request_token_store():
+    path = settings.CONNECTED_ACCOUNTS_REQUEST_TOKEN_STORE
+    if path not in request_token_stores:
+        request_token_stores[path] = import_string(path)()
+    return request_token_stores[path]
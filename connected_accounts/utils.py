@@ -0,0 +1,117 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class LRUCache(object):
+    """
+    A small, thread-safe mapping that evicts the least recently used key.
+    Entries can also expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value, expires = self.data.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.time():
+                return default
+            self.data[key] = (value, expires)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (value, expires)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class KeyedLock(object):
+    """
+    One lock per key, created on demand and discarded once nobody holds or
+    waits for it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    @contextmanager
+    def __call__(self, key):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+
+class LazyImports(object):
+    """
+    Objects imported from their dotted paths on first access, then kept as
+    plain attributes, so the module using them loads without importing them.
+    """
+
+    def __init__(self, **paths):
+        self.paths = paths
+
+    def __getattr__(self, name):
+        try:
+            path = self.__dict__['paths'][name]
+        except KeyError:
+            raise AttributeError(name)
+        module, attr = path.rsplit('.', 1)
+        value = getattr(__import__(str(module), fromlist=[str(attr)]), attr)
+        setattr(self, name, value)
+        return value
+
+
+def get_common_fields(data):
+    """
+    Return ``(email, username, name)`` from ``extract_common_fields()`` data.
+    Email and username are lowercased so they can be matched exactly.
+    """
+    name = data.get('name') or ' '.join(
+        part for part in (data.get('first_name'), data.get('last_name')) if part)
+    return (
+        (data.get('email') or '').lower()[:254],
+        (data.get('username') or '').lower()[:255],
+        (name or '')[:255],
+    )
+
+
+def get_scope_kwargs(granted_scope):
+    """
+    Keyword arguments that pass ``granted_scope`` on only when there is one,
+    so ``get_redirect_args()`` overrides without that argument keep working.
+    """
+    return {'granted_scope': granted_scope} if granted_scope else {}
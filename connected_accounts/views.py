@@ -4,15 +4,23 @@ import logging
 
 from django.contrib import messages
 from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
-from django.core.urlresolvers import reverse
+from django.db import IntegrityError
 from django.http import Http404
 from django.shortcuts import redirect
 from django.utils.encoding import force_text
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import RedirectView, View
 
+from .instrumentation import timer
 from .models import Account
 from .provider_pool import providers
+from .utils import get_scope_kwargs
+
+try:
+    from django.urls import reverse
+except ImportError:  # pragma: no cover
+    # Django < 1.10
+    from django.core.urlresolvers import reverse
 
 logger = logging.getLogger('connected_accounts')
 
@@ -44,6 +52,22 @@ class OAuthRedirect(OAuthProvidertMixin, RedirectView):
         info = self.model._meta.app_label, self.model._meta.model_name
         return reverse('admin:%s_%s_callback' % info, kwargs={'provider': provider.id})
 
+    def get_granted_scope(self, provider):
+        """
+        Return the scopes already granted to the user's account being
+        reconnected (``?account=<pk>``), so only missing ones are requested.
+        """
+        pk = self.request.GET.get('account', None)
+        if not pk:
+            return None
+        try:
+            scope = self.model._default_manager.filter(
+                pk=pk, provider=provider.id, user=self.request.user,
+            ).values_list('scope', flat=True).first()
+        except (TypeError, ValueError):
+            return None
+        return scope.split() if scope else None
+
     def get_redirect_url(self, **kwargs):
         """Build redirect url for a given provider."""
         provider_id = kwargs.get('provider', '')
@@ -52,7 +76,9 @@ class OAuthRedirect(OAuthProvidertMixin, RedirectView):
             raise Http404('Unknown OAuth provider.')
         callback = self.get_callback_url(provider)
         params = self.get_additional_parameters(provider)
-        return provider.get_redirect_url(self.request, callback=callback, parameters=params)
+        return provider.get_redirect_url(
+            self.request, callback=callback, parameters=params,
+            **get_scope_kwargs(self.get_granted_scope(provider)))
 
 
 class OAuthCallback(OAuthProvidertMixin, View):
@@ -67,23 +93,35 @@ class OAuthCallback(OAuthProvidertMixin, View):
 
         callback = self.get_callback_url(provider)
         # Fetch access token
-        raw_token = provider.get_access_token(self.request, callback=callback)
+        with timer('callback_phase', provider=provider.id, phase='token_exchange'):
+            raw_token = provider.get_access_token(self.request, callback=callback)
         if raw_token is None:
             return self.handle_login_failure(provider, 'Could not retrieve token.')
 
         # Fetch profile info
-        profile_data = provider.get_profile_data(raw_token)
+        with timer('callback_phase', provider=provider.id, phase='profile_fetch'):
+            profile_data = provider.get_profile_data(raw_token)
 
         if profile_data is None:
             return self.handle_login_failure(provider, 'Could not retrieve profile.')
 
-        identifier = provider.extract_uid(profile_data)
+        with timer('callback_phase', provider=provider.id, phase='parse'):
+            identifier = provider.extract_uid(profile_data)
+            if identifier is not None:
+                account_defaults = self.get_account_defaults(provider, raw_token, profile_data)
         if identifier is None:
             return self.handle_login_failure(provider, 'Could not determine uid.')
 
-        token, token_secret, expires_at = provider.parse_raw_token(raw_token)
+        with timer('callback_phase', provider=provider.id, phase='upsert'):
+            account, created = self.save_account(provider, identifier, account_defaults)
 
-        account_defaults = {
+        self.message_account_saved(account, created)
+        return redirect(self.get_login_redirect(provider, account))
+
+    def get_account_defaults(self, provider, raw_token, profile_data):
+        """Return the account fields to store for a successful login."""
+        token, token_secret, expires_at = provider.parse_raw_token(raw_token)
+        defaults = {
             'raw_token': raw_token,
             'oauth_token': token,
             'oauth_token_secret': token_secret,
@@ -91,26 +129,37 @@ class OAuthCallback(OAuthProvidertMixin, View):
             'extra_data': provider.extract_extra_data(profile_data),
             'expires_at': expires_at,
         }
+        scope = provider.get_granted_scope(self.request, raw_token)
+        if scope is not None:
+            defaults['scope'] = ' '.join(scope)
+        return defaults
+
+    def save_account(self, provider, identifier, defaults):
+        """Create or update the account for ``identifier``."""
+        try:
+            account, created = Account.objects.get_or_create(
+                provider=provider.id, uid=identifier, defaults=defaults
+            )
+        except IntegrityError:
+            # (provider, uid) is unique, so a concurrent callback for the
+            # same account made this insert fail; update its row instead.
+            account, created = Account.objects.get(provider=provider.id, uid=identifier), False
+
+        if not created:
+            for (key, value) in defaults.items():
+                setattr(account, key, value)
+            account.save()
+        return account, created
 
-        account, created = Account.objects.get_or_create(
-            provider=provider.id, uid=identifier, defaults=account_defaults
-        )
-
+    def message_account_saved(self, account, created):
         opts = account._meta
         msg_dict = {'name': force_text(opts.verbose_name), 'obj': force_text(account)}
 
         if created:
             msg = _('The %(name)s "%(obj)s" was added successfully.') % msg_dict
-            messages.add_message(request, messages.SUCCESS, msg)
         else:
-            for (key, value) in account_defaults.iteritems():
-                setattr(account, key, value)
-            account.save()
-
             msg = _('The %(name)s "%(obj)s" was updated successfully.') % msg_dict
-            messages.add_message(request, messages.SUCCESS, msg)
-
-        return redirect(self.get_login_redirect(provider, account))
+        messages.add_message(self.request, messages.SUCCESS, msg)
 
     def get_callback_url(self, provider):
         """Return callback url if different than the current url."""
@@ -13,13 +13,21 @@ try:
                 'NAME': 'connected_accounts',
             }
         },
-        ROOT_URLCONF='connected_accounts.urls',
+        ROOT_URLCONF='tests.urls',
         INSTALLED_APPS=[
             'django.contrib.auth',
             'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.admin',
             'django.contrib.sites',
             'connected_accounts',
         ],
+        MIDDLEWARE_CLASSES=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        ],
         SITE_ID=1,
         NOSE_ARGS=['-s'],
     )
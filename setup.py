@@ -43,6 +43,9 @@ setup(
         'requests>=1.0',
         'requests_oauthlib>=0.3.0',
     ],
+    extras_require={
+        'async': ['httpx'],
+    },
     license="BSD",
     zip_safe=False,
     keywords='django-connected, social auth, oauth, oauth2, facebook, twitter, google',
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` admin module.
+"""
+
+from __future__ import unicode_literals
+
+import json
+
+from django import forms
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection, models
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from connected_accounts.admin import AccountAdmin
+from connected_accounts.fields import AccountField
+from connected_accounts.models import Account
+from connected_accounts.widgets import AccountRawIdWidget, prefetch_account_widgets
+
+
+class Profile(models.Model):
+    account = AccountField('twitter', on_delete=models.CASCADE)
+
+    class Meta:
+        app_label = 'tests'
+
+
+class TestAccountSearch(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('admin')
+        self.account = Account.objects.create(
+            user=user, provider='twitter', uid='1A',
+            extra_data={'screen_name': 'Example', 'name': 'An Example'})
+        Account.objects.create(
+            user=user, provider='google', uid='2',
+            extra_data={'email': 'someone@example.com', 'name': 'Someone'})
+        self.model_admin = AccountAdmin(Account, admin.site)
+
+    def search(self, term):
+        queryset, use_distinct = self.model_admin.get_search_results(
+            None, Account.objects.all(), term)
+        self.assertFalse(use_distinct)
+        return list(queryset.values_list('uid', flat=True))
+
+    def test_exact_fields(self):
+        self.assertEqual(self.search('1A'), ['1A'])
+        self.assertEqual(self.search('1a'), [])
+        self.assertEqual(self.search('EXAMPLE'), ['1A'])
+        self.assertEqual(self.search('Someone@Example.com'), ['2'])
+        self.assertEqual(self.search('exam'), [])
+
+    def test_name_prefix(self):
+        self.assertEqual(self.search('An Ex'), ['1A'])
+        self.assertEqual(len(self.search('  ')), 2)
+
+
+class TestAccountChangelist(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.create_accounts(0, 2)
+
+    def create_accounts(self, start, stop):
+        for i in range(start, stop):
+            Account.objects.create(
+                user=self.user, provider='twitter', uid=str(i), raw_token='raw',
+                oauth_token='token', oauth_token_secret='secret',
+                extra_data={'screen_name': 'user{0}'.format(i)})
+
+    def get_changelist(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/connected_accounts/account/')
+        self.assertEqual(response.status_code, 200)
+        return queries
+
+    def test_queries_do_not_grow_with_rows(self):
+        queries = self.get_changelist()
+        self.create_accounts(2, 12)
+        with self.assertNumQueries(len(queries)):
+            self.get_changelist()
+
+    def test_tokens_are_deferred(self):
+        selects = [query['sql'] for query in self.get_changelist()
+                   if 'FROM "connected_accounts_account"' in query['sql'] and
+                   'COUNT(' not in query['sql']]
+        self.assertEqual(len(selects), 1)
+        for column in ('raw_token', 'oauth_token', 'oauth_token_secret'):
+            self.assertNotIn('"{0}"'.format(column), selects[0])
+
+
+class TestAccountJSONViews(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.account = Account.objects.create(
+            user=user, provider='twitter', uid='1', extra_data={'screen_name': 'before'})
+        self.other = Account.objects.create(
+            user=user, provider='twitter', uid='2', extra_data={'screen_name': 'other'})
+        self.url = '/admin/connected_accounts/account/{0}/json/'.format(self.account.pk)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.account.extra_data = {'screen_name': 'after'}
+        self.account.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('@after', response.content.decode('utf-8'))
+
+    def test_missing_account(self):
+        response = self.client.get('/admin/connected_accounts/account/0/json/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        response = self.client.get('/admin/connected_accounts/account/json/', {
+            'ids': '{0},{1},0'.format(self.account.pk, self.other.pk)})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(sorted(data), sorted([str(self.account.pk), str(self.other.pk)]))
+
+        response = self.client.get('/admin/connected_accounts/account/json/', {'ids': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestAccountRawIdWidget(TestCase):
+
+    def setUp(self):
+        field = Profile._meta.get_field('account')
+        rel = getattr(field, 'remote_field', None) or field.rel
+
+        class ProfileForm(forms.Form):
+            account = forms.ModelChoiceField(
+                Account.objects.all(), widget=AccountRawIdWidget(rel, admin.site))
+
+        user = User.objects.create_user('admin')
+        self.forms = []
+        for i in range(3):
+            account = Account.objects.create(
+                user=user, provider='twitter', uid=str(i),
+                extra_data={'screen_name': 'user{0}'.format(i)})
+            self.forms.append(ProfileForm(initial={'account': account.pk}))
+
+    def test_widgets_render_with_one_query(self):
+        with self.assertNumQueries(1):
+            prefetch_account_widgets(self.forms)
+            rendered = [str(form['account']) for form in self.forms]
+        for i, html in enumerate(rendered):
+            self.assertIn('@user{0}'.format(i), html)
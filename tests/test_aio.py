@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` aio module.
+"""
+
+import json
+from unittest import skipIf
+
+from django.test import RequestFactory, TestCase
+
+from connected_accounts.providers.base import signers
+from connected_accounts.providers.facebook import FacebookProvider
+from connected_accounts.providers.twitter import TwitterProvider
+from connected_accounts.retry import breakers
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+try:
+    import asyncio
+    import httpx
+    from connected_accounts.providers.aio import async_clients
+except (ImportError, SyntaxError):  # pragma: no cover
+    httpx = None
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:  # pragma: no cover
+    from urlparse import parse_qs
+
+
+@skipIf(httpx is None, 'The async provider API requires httpx')
+class AsyncProviderTestCase(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        breakers.reset()
+        self.addCleanup(breakers.reset)
+
+        self.requests = []
+        self.response = httpx.Response(200, text='ok')
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        patcher = mock.patch.object(async_clients, 'get_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.wait, client.aclose())
+
+    def handle(self, request):
+        self.requests.append(request)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+    def wait(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+
+class TestAsyncOAuthProvider(AsyncProviderTestCase):
+
+    def setUp(self):
+        super(TestAsyncOAuthProvider, self).setUp()
+        self.provider = TwitterProvider()
+        self.provider.consumer_key = 'key'
+        self.provider.consumer_secret = 'secret'
+        signers.clear()
+
+    def test_request_is_signed(self):
+        raw_token = 'oauth_token=token&oauth_token_secret=secret'
+        response = self.wait(self.provider.arequest(
+            'get', 'https://api.example.com/1', token=raw_token, params={'a': 'b'}))
+        self.assertEqual(response.text, 'ok')
+
+        request = self.requests[0]
+        self.assertEqual(str(request.url), 'https://api.example.com/1?a=b')
+        authorization = request.headers['Authorization']
+        self.assertTrue(authorization.startswith('OAuth '))
+        self.assertIn('oauth_token="token"', authorization)
+        self.assertIn('oauth_consumer_key="key"', authorization)
+
+    def test_request_token(self):
+        self.response = httpx.Response(200, text='oauth_token=request&oauth_token_secret=s')
+        request = RequestFactory().get('/login/twitter/')
+        self.assertEqual(
+            self.wait(self.provider.aget_request_token(request, '/callback/')),
+            'oauth_token=request&oauth_token_secret=s')
+
+        request = self.requests[0]
+        self.assertEqual((request.method, str(request.url)),
+                         ('POST', self.provider.request_token_url))
+        self.assertIn('oauth_callback="http%3A%2F%2Ftestserver%2Fcallback%2F"',
+                      request.headers['Authorization'])
+
+    def test_request_token_error(self):
+        self.response = httpx.ConnectError('refused')
+        request = RequestFactory().get('/login/twitter/')
+        self.assertIsNone(self.wait(self.provider.aget_request_token(request, '/callback/')))
+        # A signed request is never retried.
+        self.assertEqual(len(self.requests), 1)
+
+
+class TestAsyncOAuth2Provider(AsyncProviderTestCase):
+
+    def setUp(self):
+        super(TestAsyncOAuth2Provider, self).setUp()
+        self.provider = FacebookProvider()
+        self.provider.consumer_key = 'key'
+        self.provider.consumer_secret = 'secret'
+
+    def test_request_adds_access_token(self):
+        self.wait(self.provider.arequest(
+            'get', 'https://graph.example.com/me', token='{"access_token": "token"}'))
+        self.assertEqual(self.requests[0].url.params['access_token'], 'token')
+
+    def test_access_token(self):
+        self.response = httpx.Response(200, text='{"access_token": "token"}')
+        request = RequestFactory().get('/callback/facebook/', {'code': 'code'})
+        with mock.patch.object(self.provider, 'get_access_token_kwargs',
+                               return_value={'data': {'code': 'code'}}):
+            self.assertEqual(self.wait(self.provider.aget_access_token(request)),
+                             '{"access_token": "token"}')
+        self.assertEqual(self.requests[0].method, 'POST')
+        self.assertEqual(parse_qs(self.requests[0].content.decode())['code'], ['code'])
+
+    def test_access_token_rejected(self):
+        request = RequestFactory().get('/callback/facebook/')
+        with mock.patch.object(self.provider, 'get_access_token_kwargs', return_value=None):
+            self.assertIsNone(self.wait(self.provider.aget_access_token(request)))
+        self.assertEqual(self.requests, [])
+
+        self.response = httpx.Response(400, text='bad code')
+        with mock.patch.object(self.provider, 'get_access_token_kwargs',
+                               return_value={'data': {'code': 'code'}}):
+            self.assertIsNone(self.wait(self.provider.aget_access_token(request)))
+
+    def test_refresh_access_token(self):
+        self.response = httpx.Response(200, text='{"access_token": "new"}')
+        raw_token = json.dumps({'access_token': 'old', 'refresh_token': 'refresh'})
+        self.assertEqual(self.wait(self.provider.arefresh_access_token(raw_token)),
+                         '{"access_token": "new"}')
+
+        data = parse_qs(self.requests[0].content.decode())
+        self.assertEqual(data['grant_type'], ['refresh_token'])
+        self.assertEqual(data['refresh_token'], ['refresh'])
+
+        self.response = httpx.Response(401)
+        self.assertIsNone(self.wait(self.provider.arefresh_access_token(raw_token)))
+
+    def test_profile_data(self):
+        self.response = httpx.Response(200, json={'id': '1'})
+        self.assertEqual(self.wait(self.provider.aget_profile_data('{"access_token": "t"}')),
+                         {'id': '1'})
+
+        self.response = httpx.Response(404)
+        self.assertIsNone(self.wait(self.provider.aget_profile_data('{"access_token": "t"}')))
+
+
+@skipIf(httpx is None, 'The async provider API requires httpx')
+class TestAsyncClientPool(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_client_per_provider_until_closed(self):
+        async def get_clients():
+            return [async_clients.get_client(provider_id)
+                    for provider_id in ('twitter', 'twitter', 'facebook')]
+
+        first, second, other = self.loop.run_until_complete(get_clients())
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+        self.loop.run_until_complete(async_clients.aclose())
+        self.assertTrue(first.is_closed)
+        self.assertTrue(other.is_closed)
+        reopened = self.loop.run_until_complete(get_clients())[0]
+        self.assertIsNot(reopened, first)
+        self.loop.run_until_complete(async_clients.aclose())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` async_views module.
+"""
+
+from unittest import skipIf
+
+import django
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory, TestCase
+
+from connected_accounts.models import Account
+from connected_accounts.providers.facebook import FacebookProvider
+
+try:
+    from asgiref.sync import async_to_sync
+    from connected_accounts.async_views import AsyncOAuthCallback
+except (ImportError, SyntaxError):  # pragma: no cover
+    AsyncOAuthCallback = None
+
+
+@skipIf(AsyncOAuthCallback is None or django.VERSION < (3, 1),
+        'The async views require asgiref and Django 3.1+')
+class TestAsyncOAuthCallback(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('admin')
+        self.provider = FacebookProvider()
+
+        async def aget_access_token(request, callback=None):
+            return '{"access_token": "token"}'
+
+        async def aget_profile_data(raw_token):
+            return {'id': '1', 'email': 'User@example.com'}
+
+        self.provider.aget_access_token = aget_access_token
+        self.provider.aget_profile_data = aget_profile_data
+
+    def get_response(self):
+        class Callback(AsyncOAuthCallback):
+            def get_login_redirect(self, provider, account):
+                return '/done/'
+
+        request = RequestFactory().get('/callback/facebook/', {'code': 'code'})
+        request.user = self.user
+        request.session = {}
+        request._messages = CookieStorage(request)
+        view = Callback.as_view(provider=self.provider)
+
+        async def call():
+            return await view(request, provider='facebook')
+        return async_to_sync(call)()
+
+    def test_creates_then_updates_account(self):
+        response = self.get_response()
+        self.assertEqual(response.status_code, 302)
+        account = Account.objects.get(provider='facebook', uid='1')
+        self.assertEqual(account.oauth_token, 'token')
+        self.assertEqual(account.email, 'user@example.com')
+
+        Account.objects.filter(pk=account.pk).update(oauth_token='old')
+        self.get_response()
+        self.assertEqual(Account.objects.get(pk=account.pk).oauth_token, 'token')
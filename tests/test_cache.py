@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` cache module.
+"""
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+import connected_accounts.providers  # noqa
+from connected_accounts.cache import get_account_json, get_profile_cache
+from connected_accounts.models import Account
+from connected_accounts.provider_pool import providers
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+class TestAccountJSONCache(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('admin')
+        self.account = Account.objects.create(
+            user=user, provider='twitter', uid='1', extra_data={'screen_name': 'before'})
+
+    def test_cached_until_saved(self):
+        content, etag = get_account_json(self.account)
+        with mock.patch.object(Account, 'to_json') as to_json:
+            self.assertEqual(get_account_json(self.account), (content, etag))
+            self.assertFalse(to_json.called)
+
+        self.account.extra_data = {'screen_name': 'after'}
+        self.account.save()
+        content, new_etag = get_account_json(self.account)
+        self.assertIn('@after', content)
+        self.assertNotEqual(etag, new_etag)
+
+    def test_expired_token_is_not_cached(self):
+        self.account.expires_at = timezone.now() - timedelta(seconds=1)
+        with mock.patch.object(Account, 'to_json', return_value='{}') as to_json:
+            get_account_json(self.account)
+            get_account_json(self.account)
+            self.assertEqual(to_json.call_count, 2)
+
+
+@override_settings(CONNECTED_ACCOUNTS_PROFILE_CACHE=True)
+class TestProfileCache(TestCase):
+
+    def setUp(self):
+        self.provider = providers.by_id('twitter')
+        profile_cache = get_profile_cache()
+        profile_cache.local.clear()
+        self.addCleanup(profile_cache.delete, self.provider, 'token')
+
+    def test_profile_fetched_once(self):
+        with mock.patch.object(self.provider, 'fetch_profile_data', return_value={'id': 1}) as fetch:
+            self.assertEqual(self.provider.get_profile_data('token'), {'id': 1})
+            self.assertEqual(self.provider.get_profile_data('token'), {'id': 1})
+            self.assertEqual(fetch.call_count, 1)
+
+        # The shared tier refills the local one.
+        get_profile_cache().local.clear()
+        with mock.patch.object(self.provider, 'fetch_profile_data') as fetch:
+            self.assertEqual(self.provider.get_profile_data('token'), {'id': 1})
+            self.assertFalse(fetch.called)
+
+    def test_failures_are_not_cached(self):
+        with mock.patch.object(self.provider, 'fetch_profile_data', return_value=None) as fetch:
+            self.provider.get_profile_data('token')
+            self.provider.get_profile_data('token')
+            self.assertEqual(fetch.call_count, 2)
+
+    @override_settings(CONNECTED_ACCOUNTS_PROFILE_CACHE_TTLS={'twitter': 0})
+    def test_provider_ttl(self):
+        with mock.patch.object(self.provider, 'fetch_profile_data', return_value={'id': 1}) as fetch:
+            self.provider.get_profile_data('token')
+            self.provider.get_profile_data('token')
+            self.assertEqual(fetch.call_count, 2)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` import time.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+import unittest
+
+SCRIPT = """
+from django.conf import settings
+settings.configure(
+    INSTALLED_APPS=[
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'connected_accounts',
+        'connected_accounts.providers',
+    ],
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+)
+import django
+django.setup()
+import connected_accounts.models
+"""
+
+# Packages only needed once a provider is actually called.
+NETWORK_PACKAGES = ('requests', 'requests_oauthlib', 'oauthlib', 'urllib3', 'httpx')
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires Python 3.7+')
+class TestImportTime(unittest.TestCase):
+
+    def get_import_times(self):
+        """Return ``{module: self time in us}`` from ``python -X importtime``."""
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+            stderr=subprocess.STDOUT, env=env)
+        times = {}
+        for line in output.decode('utf-8').splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(own)
+        return times
+
+    def test_models_do_not_import_http_stack(self):
+        # Modules loaded with importlib.import_module(), as Django loads
+        # apps and models, are not reported themselves, only what they import.
+        times = self.get_import_times()
+        self.assertIn('connected_accounts.providers.base', times)
+        own = sum(us for name, us in times.items() if name.startswith('connected_accounts.'))
+        loaded = [name for name in times if name.split('.')[0] in NETWORK_PACKAGES]
+        self.assertEqual(loaded, [], 'connected_accounts took {0}us and imported {1}'.format(
+            own, ', '.join(loaded)))
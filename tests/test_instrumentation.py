@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` instrumentation module.
+"""
+
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import connected_accounts.providers  # noqa
+from connected_accounts.instrumentation import histograms, null_timer, timer, timing_recorded
+from connected_accounts.provider_pool import providers
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+class TestInstrumentation(TestCase):
+
+    def setUp(self):
+        histograms.clear()
+        self.addCleanup(histograms.clear)
+
+    def test_disabled(self):
+        self.assertIs(timer('provider_call', provider='twitter'), null_timer)
+
+    @override_settings(CONNECTED_ACCOUNTS_INSTRUMENTATION=True)
+    def test_provider_call(self):
+        provider = providers.by_id('google')
+        received = []
+
+        def receiver(sender, name, elapsed, tags, **kwargs):
+            received.append((name, dict(tags)))
+
+        timing_recorded.connect(receiver)
+        self.addCleanup(timing_recorded.disconnect, receiver)
+        with mock.patch.object(provider, 'get_session') as get_session:
+            get_session.return_value.request.return_value = mock.Mock(status_code=200, headers={})
+            provider.get_profile_data('{"access_token": "a"}')
+            provider.get_profile_data('{"access_token": "a"}')
+
+        tags = {'provider': 'google', 'operation': 'profile', 'status': 200}
+        self.assertEqual(received, [('provider_call', tags)] * 2)
+        summary = histograms.get('provider_call', **tags).summary()
+        self.assertEqual(summary['count'], 2)
+        self.assertTrue(summary['p50'] <= summary['p95'] <= summary['p99'])
+
+    @override_settings(CONNECTED_ACCOUNTS_INSTRUMENTATION=True)
+    def test_error_is_tagged(self):
+        with self.assertRaises(ValueError):
+            with timer('callback_phase', phase='upsert'):
+                raise ValueError
+        self.assertEqual(histograms.get('callback_phase', phase='upsert', error='ValueError').count, 1)
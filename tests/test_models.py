@@ -8,6 +8,7 @@ test_django-connected
 Tests for `django-connected` models module.
 """
 
+import json
 import os
 import shutil
 
@@ -15,6 +16,11 @@ from django.test import TestCase
 
 from connected_accounts.models import Account
 
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
 
 class TestConnectedAccounts(TestCase):
 
@@ -26,3 +32,101 @@ class TestConnectedAccounts(TestCase):
 
     def tearDown(self):
         pass
+
+
+class TestRefreshAccessToken(TestCase):
+
+    def setUp(self):
+        import connected_accounts.providers  # noqa
+        from django.contrib.auth.models import User
+
+        user = User.objects.create(username='admin')
+        self.account = Account.objects.create(
+            user=user, provider='facebook', uid='1', raw_token='{"access_token": "old"}',
+            oauth_token='old', oauth_token_secret='refresh', extra_data={})
+
+    def test_stores_rotated_refresh_token(self):
+        raw_token = json.dumps({'access_token': 'new', 'refresh_token': 'rotated'})
+        with mock.patch.object(self.account.get_provider(), 'refresh_access_token',
+                               return_value=raw_token):
+            self.assertTrue(self.account.refresh_access_token())
+
+        account = Account.objects.get(pk=self.account.pk)
+        self.assertEqual(account.oauth_token, 'new')
+        self.assertEqual(account.oauth_token_secret, 'rotated')
+
+    def test_expiry_counts_from_refresh(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        raw_token = json.dumps({'access_token': 'new', 'expires': 60})
+        provider = self.account.get_provider()
+        provider.get_parsed_token(raw_token)
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch.object(provider, 'refresh_access_token', return_value=raw_token):
+            with mock.patch('connected_accounts.providers.base.timezone.now', return_value=later):
+                self.account.refresh_access_token()
+        self.assertEqual(self.account.expires_at, later + timedelta(seconds=60))
+
+    def test_reuses_token_refreshed_concurrently(self):
+        Account.objects.filter(pk=self.account.pk).update(
+            raw_token='{"access_token": "new"}', oauth_token='new')
+
+        with mock.patch.object(self.account.get_provider(), 'refresh_access_token') as refresh:
+            self.assertTrue(self.account.refresh_access_token())
+
+        self.assertFalse(refresh.called)
+        self.assertEqual(self.account.oauth_token, 'new')
+
+
+class TestAccountConstraints(TestCase):
+
+    def test_provider_uid_is_unique(self):
+        from django.contrib.auth.models import User
+        from django.db import IntegrityError, transaction
+
+        user = User.objects.create(username='admin')
+        Account.objects.create(user=user, provider='facebook', uid='1', extra_data={})
+        with transaction.atomic():
+            self.assertRaises(
+                IntegrityError, Account.objects.create,
+                user=user, provider='facebook', uid='1', extra_data={})
+        Account.objects.create(user=user, provider='twitter', uid='1', extra_data={})
+
+    def test_callback_updates_existing_account(self):
+        from django.contrib.auth.models import User
+        from connected_accounts.provider_pool import providers
+        from connected_accounts.views import OAuthCallback
+
+        user = User.objects.create(username='admin')
+        Account.objects.create(user=user, provider='facebook', uid='1', extra_data={})
+        account, created = OAuthCallback().save_account(
+            providers.by_id('facebook'), '1', {'user': user, 'oauth_token': 'new'})
+        self.assertFalse(created)
+        self.assertEqual(Account.objects.get(provider='facebook', uid='1').oauth_token, 'new')
+
+
+class TestCommonFields(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.user = User.objects.create(username='admin')
+
+    def test_populated_on_save(self):
+        account = Account.objects.create(
+            user=self.user, provider='twitter', uid='1',
+            extra_data={'screen_name': 'Example', 'name': 'An Example'})
+        self.assertEqual(
+            Account.objects.filter(username='example').get().name, 'An Example')
+
+        account.extra_data = {'screen_name': 'renamed'}
+        account.save(update_fields=('extra_data', ))
+        account = Account.objects.get(pk=account.pk)
+        self.assertEqual((account.username, account.name), ('renamed', ''))
+
+    def test_first_and_last_name(self):
+        account = Account.objects.create(
+            user=self.user, provider='google', uid='1',
+            extra_data={'email': 'Someone@Example.com', 'given_name': 'Some', 'family_name': 'One'})
+        self.assertEqual((account.email, account.name), ('someone@example.com', 'Some One'))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` provider_pool module.
+"""
+
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from connected_accounts.provider_pool import ProviderRegistry
+from connected_accounts.providers.base import OAuth2Provider
+
+
+class ExampleProvider(OAuth2Provider):
+    id = 'example'
+    name = 'Example'
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        ExampleProvider.instances += 1
+        super(ExampleProvider, self).__init__(*args, **kwargs)
+
+
+@override_settings(CONNECTED_ACCOUNTS_AUTODISCOVER=False,
+                   CONNECTED_ACCOUNTS_PROVIDER_ENTRY_POINTS=False)
+class TestProviderRegistry(TestCase):
+
+    def setUp(self):
+        ExampleProvider.instances = 0
+
+    def test_lazy_instantiation(self):
+        registry = ProviderRegistry()
+        registry.register(ExampleProvider)
+        self.assertEqual(list(registry.as_choices()), [('example', 'Example')])
+        self.assertEqual(ExampleProvider.instances, 0)
+
+        provider = registry.by_id('example')
+        self.assertIsInstance(provider, ExampleProvider)
+        self.assertIs(registry.by_id('example'), provider)
+        self.assertEqual(ExampleProvider.instances, 1)
+        self.assertIn('instantiate', registry.timings['example'])
+        self.assertIsNone(registry.by_id('missing'))
+
+    @override_settings(CONNECTED_ACCOUNTS_PROVIDERS=['tests.test_provider_pool.ExampleProvider'])
+    def test_explicit_registration(self):
+        registry = ProviderRegistry()
+        self.assertEqual([provider.id for provider in registry.get_list()], ['example'])
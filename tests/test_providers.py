@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` providers module.
+"""
+
+import json
+
+from django.test import RequestFactory, TestCase
+
+from connected_accounts.providers.base import parsed_tokens, signers
+from connected_accounts.providers.facebook import FacebookProvider
+from connected_accounts.providers.google import GoogleProvider
+from connected_accounts.providers.twitter import TwitterProvider
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+class TestOAuth2Provider(TestCase):
+
+    def setUp(self):
+        self.provider = FacebookProvider()
+        parsed_tokens.clear()
+
+    def test_parse_json_token(self):
+        raw_token = json.dumps({'access_token': 'token', 'refresh_token': 'refresh', 'expires': 60})
+        token, refresh_token, expires_at = self.provider.parse_raw_token(raw_token)
+        self.assertEqual(token, 'token')
+        self.assertEqual(refresh_token, 'refresh')
+        self.assertIsNotNone(expires_at)
+
+    def test_parse_query_string_token(self):
+        token, refresh_token, expires_at = self.provider.parse_raw_token(
+            'access_token=token&expires=60')
+        self.assertEqual(token, 'token')
+        self.assertIsNone(refresh_token)
+        self.assertIsNotNone(expires_at)
+
+    def test_parsed_token_is_reused(self):
+        raw_token = json.dumps({'access_token': 'token'})
+        with mock.patch.object(self.provider, 'parse_raw_token',
+                               wraps=self.provider.parse_raw_token) as parse_raw_token:
+            first = self.provider.get_parsed_token(raw_token)
+            second = self.provider.get_parsed_token(raw_token)
+        self.assertEqual(first, second)
+        self.assertEqual(parse_raw_token.call_count, 1)
+
+
+class TestOAuthProvider(TestCase):
+
+    def setUp(self):
+        self.provider = TwitterProvider()
+        self.provider.consumer_key = 'key'
+        self.provider.consumer_secret = 'secret'
+        signers.clear()
+
+        self.response = mock.Mock(status_code=200, headers={})
+        session = mock.Mock()
+        session.request.return_value = self.response
+        self.session = session
+        self.provider.get_session = lambda: session
+
+    def test_signer_is_reused_for_token(self):
+        raw_token = 'oauth_token=token&oauth_token_secret=secret'
+        self.provider.request('get', 'https://api.example.com/1', token=raw_token)
+        self.provider.request('get', 'https://api.example.com/2', token=raw_token)
+        first, second = [call[1]['auth'] for call in self.session.request.call_args_list]
+        self.assertIs(first, second)
+        self.assertEqual(first.client.resource_owner_key, 'token')
+
+        self.provider.request('get', 'https://api.example.com/3', token='oauth_token=other')
+        self.assertIsNot(self.session.request.call_args[1]['auth'], first)
+
+    def test_signer_with_verifier_is_not_cached(self):
+        raw_token = 'oauth_token=token&oauth_token_secret=secret'
+        self.provider.request('post', 'https://api.example.com/access_token',
+                              token=raw_token, data={'oauth_verifier': 'verifier'})
+        self.assertEqual(len(signers), 0)
+
+    def test_api_session_signs_requests(self):
+        raw_token = 'oauth_token=token&oauth_token_secret=secret'
+        api = self.provider.get_api_session(raw_token)
+        self.assertIs(api.get('https://api.example.com/1'), self.response)
+
+        method, url = self.session.request.call_args[0]
+        kwargs = self.session.request.call_args[1]
+        self.assertEqual((method, url), ('get', 'https://api.example.com/1'))
+        self.assertIs(kwargs['auth'], api.auth)
+        self.assertIs(api.auth, self.provider.get_token_auth(raw_token))
+
+
+class TestScope(TestCase):
+
+    def setUp(self):
+        self.provider = GoogleProvider()
+        self.provider.scope = ['profile', 'email']
+
+    def get_request(self, **params):
+        request = RequestFactory().get('/login/google/', params)
+        request.session = {}
+        return request
+
+    def test_dynamic_scope_does_not_grow_provider_scope(self):
+        for _ in range(3):
+            scope = self.provider.get_scope(self.get_request(scope='drive,email'))
+        self.assertEqual(scope, ['profile', 'email', 'drive'])
+        self.assertEqual(self.provider.scope, ['profile', 'email'])
+
+    def test_requests_only_missing_scopes(self):
+        request = self.get_request(scope='drive')
+        args = self.provider.get_redirect_args(
+            request, '/callback/google/', granted_scope=['profile', 'email'])
+        self.assertEqual(args['scope'], 'drive')
+        self.assertEqual(args['include_granted_scopes'], 'true')
+        self.assertEqual(
+            self.provider.get_granted_scope(request, '{"access_token": "token"}'),
+            ['profile', 'email', 'drive'])
+
+    def test_requests_full_scope_without_incremental_support(self):
+        provider = FacebookProvider()
+        provider.incremental_scope = False
+        provider.scope = ['email', 'public_profile']
+        args = provider.get_redirect_args(
+            self.get_request(), '/callback/facebook/', granted_scope=['email'])
+        self.assertEqual(args['scope'], 'email public_profile')
+
+    def test_granted_scope_reported_by_provider(self):
+        request = self.get_request()
+        self.provider.get_redirect_args(request, '/callback/google/')
+        raw_token = json.dumps({'access_token': 'token', 'scope': 'openid email drive'})
+        self.assertEqual(
+            self.provider.get_granted_scope(request, raw_token), ['openid', 'email', 'drive'])
+        self.assertIsNone(self.provider.get_granted_scope(self.get_request(), 'access_token=token'))
+
+    def test_reconnect_reads_only_own_account_scope(self):
+        from django.contrib.auth.models import User
+        from connected_accounts.models import Account
+        from connected_accounts.views import OAuthRedirect
+
+        owner = User.objects.create(username='owner')
+        other = User.objects.create(username='other')
+        account = Account.objects.create(
+            user=owner, provider='google', uid='1', extra_data={}, scope='profile drive')
+
+        view = OAuthRedirect()
+        for user, scope in ((owner, ['profile', 'drive']), (other, None)):
+            view.request = self.get_request(account=account.pk)
+            view.request.user = user
+            self.assertEqual(view.get_granted_scope(self.provider), scope)
+
+    def test_redirect_args_override_without_granted_scope(self):
+        class LegacyProvider(GoogleProvider):
+            def get_redirect_args(self, request, callback):
+                return super(LegacyProvider, self).get_redirect_args(request, callback)
+
+        provider = LegacyProvider()
+        url = provider.get_redirect_url(self.get_request(), '/callback/google/')
+        self.assertTrue(url.startswith(provider.authorization_url))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` ratelimit module.
+"""
+
+from __future__ import unicode_literals
+
+import time
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from requests.structures import CaseInsensitiveDict
+
+import connected_accounts.providers  # noqa
+from connected_accounts.provider_pool import providers
+from connected_accounts.ratelimit import RateLimiter, RateLimitExceeded, get_retry_after
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+def make_response(status_code=200, **headers):
+    return mock.Mock(status_code=status_code, headers=CaseInsensitiveDict(
+        (name.replace('_', '-'), value) for name, value in headers.items()))
+
+
+class TestRetryAfter(TestCase):
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(get_retry_after(make_response(429, Retry_After='30')), 30)
+
+    def test_rate_limit_reset(self):
+        now = time.time()
+        response = make_response(
+            200, x_rate_limit_remaining='0', x_rate_limit_reset=str(int(now) + 60))
+        self.assertAlmostEqual(get_retry_after(response, now=now), 60, delta=1)
+        response = make_response(200, x_rate_limit_remaining='5', x_rate_limit_reset='1')
+        self.assertIsNone(get_retry_after(response))
+
+    @override_settings(CONNECTED_ACCOUNTS_RATE_LIMIT_BACKOFF=42)
+    def test_facebook_usage(self):
+        response = make_response(200, X_App_Usage='{"call_count": 100, "total_time": 10}')
+        self.assertEqual(get_retry_after(response), 42)
+        self.assertEqual(get_retry_after(make_response(429)), 42)
+
+
+@override_settings(CONNECTED_ACCOUNTS_RATE_LIMITS={'twitter': (2, 60)},
+                   CONNECTED_ACCOUNTS_RATE_LIMIT_MAX_WAIT=0)
+class TestRateLimiter(TestCase):
+
+    def setUp(self):
+        self.provider = providers.by_id('twitter')
+
+    def assertLimited(self, limiter, token=None):
+        limiter.acquire(self.provider, token)
+        limiter.acquire(self.provider, token)
+        self.assertRaises(RateLimitExceeded, limiter.acquire, self.provider, token)
+
+    def test_token_bucket(self):
+        self.assertLimited(RateLimiter())
+
+    @override_settings(CONNECTED_ACCOUNTS_RATE_LIMIT_PER_TOKEN=True)
+    def test_per_token(self):
+        limiter = RateLimiter()
+        self.assertLimited(limiter, 'first')
+        self.assertLimited(limiter, 'second')
+
+    @override_settings(CONNECTED_ACCOUNTS_RATE_LIMIT_SHARED=True)
+    def test_shared(self):
+        self.assertLimited(RateLimiter())
+        # Another worker sees the same budget.
+        self.assertRaises(RateLimitExceeded, RateLimiter().acquire, self.provider)
+
+    def test_paused_by_response(self):
+        limiter = RateLimiter()
+        limiter.update(self.provider, make_response(429, Retry_After='30'))
+        self.assertRaises(RateLimitExceeded, limiter.acquire, self.provider)
+
+    def test_request_is_not_sent(self):
+        with mock.patch('connected_accounts.ratelimit.rate_limiter', RateLimiter()):
+            with mock.patch.object(self.provider, 'get_session') as get_session:
+                get_session.return_value.request.return_value = make_response(200)
+                self.provider.get_profile_data('oauth_token=a&oauth_token_secret=b')
+                self.provider.get_profile_data('oauth_token=a&oauth_token_secret=b')
+                self.assertIsNone(
+                    self.provider.get_profile_data('oauth_token=a&oauth_token_secret=b'))
+                self.assertEqual(get_session.return_value.request.call_count, 2)
+
+    @override_settings(CONNECTED_ACCOUNTS_RATE_LIMITS={'twitter': (10, 60)})
+    def test_pause_is_per_token_and_spares_handshake(self):
+        limiter = RateLimiter()
+        raw_token = 'oauth_token=a&oauth_token_secret=b'
+        with mock.patch('connected_accounts.ratelimit.rate_limiter', limiter):
+            with mock.patch.object(self.provider, 'get_session') as get_session:
+                request = get_session.return_value.request
+                request.return_value = make_response(429, Retry_After='900')
+                self.provider.get_profile_data(raw_token)
+
+                request.return_value = mock.Mock(
+                    status_code=200, headers={}, text='oauth_token=request&oauth_token_secret=s')
+                self.assertEqual(
+                    self.provider.fetch_request_token('http://testserver/callback/'),
+                    'oauth_token=request&oauth_token_secret=s')
+        # Another account is not paused either.
+        self.assertRaises(RateLimitExceeded, limiter.acquire, self.provider, raw_token)
+        limiter.acquire(self.provider, 'oauth_token=c&oauth_token_secret=d')
+
+    @override_settings(CONNECTED_ACCOUNTS_RATE_LIMITS={})
+    def test_headers_ignored_without_limit(self):
+        limiter = RateLimiter()
+        limiter.update(self.provider, make_response(429, Retry_After='30'))
+        limiter.acquire(self.provider)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` token refresh sweeper.
+"""
+
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+import connected_accounts.providers  # noqa
+from connected_accounts.models import Account
+from connected_accounts.providers.facebook import FacebookProvider
+from connected_accounts.refresh import TokenRefresher
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+class TestTokenRefresher(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        now = timezone.now()
+        self.expiring = self.create_account('1', now + timedelta(seconds=60))
+        self.fresh = self.create_account('2', now + timedelta(days=30))
+        self.no_refresh_token = self.create_account(
+            '3', now + timedelta(seconds=60), oauth_token_secret='')
+
+    def create_account(self, uid, expires_at, oauth_token_secret='refresh'):
+        return Account.objects.create(
+            user=self.user, provider='facebook', uid=uid, raw_token='{}',
+            oauth_token='token', oauth_token_secret=oauth_token_secret,
+            extra_data={}, expires_at=expires_at)
+
+    @mock.patch.object(FacebookProvider, 'refresh_access_token')
+    def test_refreshes_expiring_accounts(self, refresh_access_token):
+        refresh_access_token.return_value = json.dumps(
+            {'access_token': 'new-token', 'expires': 3600})
+
+        results = TokenRefresher(window=300, workers=1).run()
+
+        self.assertEqual(results, {'refreshed': 1, 'failed': 0})
+        self.assertEqual(refresh_access_token.call_count, 1)
+        self.assertEqual(Account.objects.get(pk=self.expiring.pk).oauth_token, 'new-token')
+        self.assertEqual(Account.objects.get(pk=self.fresh.pk).oauth_token, 'token')
+
+    @mock.patch.object(FacebookProvider, 'refresh_access_token')
+    def test_records_failures(self, refresh_access_token):
+        refresh_access_token.return_value = None
+
+        refresher = TokenRefresher(window=300, workers=1)
+        results = refresher.run()
+
+        self.assertEqual(results, {'refreshed': 0, 'failed': 1})
+        self.assertEqual(refresher.failed, [self.expiring.pk])
+
+    @mock.patch.object(FacebookProvider, 'refresh_access_token')
+    def test_leased_accounts_are_skipped(self, refresh_access_token):
+        refresh_access_token.return_value = None
+
+        TokenRefresher(window=300, workers=1).run()
+        self.assertIsNotNone(Account.objects.get(pk=self.expiring.pk).refresh_leased_until)
+
+        # Another sweep leaves the account alone until the lease runs out.
+        self.assertEqual(TokenRefresher(window=300, workers=1).run(), {'refreshed': 0, 'failed': 0})
+        self.assertEqual(refresh_access_token.call_count, 1)
+
+    @mock.patch.object(FacebookProvider, 'refresh_access_token')
+    def test_refresh_releases_lease(self, refresh_access_token):
+        refresh_access_token.return_value = json.dumps(
+            {'access_token': 'new-token', 'expires': 60})
+
+        TokenRefresher(window=300, workers=1).run()
+
+        account = Account.objects.get(pk=self.expiring.pk)
+        self.assertIsNone(account.refresh_leased_until)
+        # Still expiring within the window, so the next sweep refreshes it again.
+        self.assertEqual(TokenRefresher(window=300, workers=1).run(), {'refreshed': 1, 'failed': 0})
+
+    @mock.patch.object(FacebookProvider, 'refresh_access_token')
+    def test_failures_back_off(self, refresh_access_token):
+        refresh_access_token.return_value = None
+        Account.objects.filter(pk=self.expiring.pk).update(refresh_failures=2)
+
+        before = timezone.now()
+        TokenRefresher(window=300, workers=1, lease=60).run()
+
+        account = Account.objects.get(pk=self.expiring.pk)
+        self.assertEqual(account.refresh_failures, 3)
+        self.assertGreaterEqual(account.refresh_leased_until, before + timedelta(seconds=480))
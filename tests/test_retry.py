@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` retry module.
+"""
+
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from requests.exceptions import ConnectionError
+
+import connected_accounts.providers  # noqa
+from connected_accounts.provider_pool import providers
+from connected_accounts.retry import CircuitOpenError, breakers
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+def make_response(status_code):
+    return mock.Mock(status_code=status_code, headers={})
+
+
+@override_settings(CONNECTED_ACCOUNTS_RETRIES=2,
+                   CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_THRESHOLD=3,
+                   CONNECTED_ACCOUNTS_CIRCUIT_BREAKER_TIMEOUT=30)
+class TestRetry(TestCase):
+
+    def setUp(self):
+        self.provider = providers.by_id('google')
+        breakers.reset()
+        self.addCleanup(breakers.reset)
+        patcher = mock.patch('connected_accounts.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(self.provider, 'get_session')
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_get_is_retried(self):
+        self.session.request.side_effect = [
+            ConnectionError('reset'), make_response(503), make_response(200)]
+        response = self.provider.request('get', 'https://example.com/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.request.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_post_is_not_retried(self):
+        self.session.request.return_value = make_response(503)
+        response = self.provider.request('post', 'https://example.com/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_circuit_opens(self):
+        self.session.request.side_effect = ConnectionError('down')
+        self.assertRaises(ConnectionError, self.provider.request, 'get', 'https://example.com/')
+        self.assertTrue(breakers.get('google').is_open)
+
+        self.session.request.reset_mock()
+        self.assertIsNone(self.provider.get_profile_data('{"access_token": "a"}'))
+        self.assertRaises(CircuitOpenError, self.provider.request, 'get', 'https://example.com/')
+        self.assertFalse(self.session.request.called)
+
+    def test_trial_call_closes_circuit(self):
+        breaker = breakers.get('google')
+        for _ in range(3):
+            breaker.record_failure()
+        breaker.opened_at -= 30
+        self.session.request.return_value = make_response(200)
+        self.provider.request('get', 'https://example.com/')
+        self.assertFalse(breaker.is_open)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` state module.
+"""
+
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from connected_accounts.providers.google import GoogleProvider
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # pragma: no cover
+    # Python 2.X
+    from urlparse import parse_qs, urlparse
+
+
+@override_settings(CONNECTED_ACCOUNTS_STATELESS_STATE=True)
+class TestStatelessState(TestCase):
+
+    def setUp(self):
+        self.provider = GoogleProvider()
+        self.provider.scope = ['profile', 'email']
+        self.user = User.objects.create_user('admin')
+
+    def get_request(self, user=None, **params):
+        request = RequestFactory().get('/callback/google/', params)
+        request.user = user or self.user
+        request.session = {}
+        return request
+
+    def redirect(self, user=None):
+        request = self.get_request(user)
+        url = self.provider.get_redirect_url(request, '/callback/google/')
+        self.assertEqual(request.session, {})
+        return parse_qs(urlparse(url).query)['state'][0]
+
+    def test_state_is_accepted_once(self):
+        state = self.redirect()
+        request = self.get_request(state=state, code='code')
+        self.assertTrue(self.provider.check_application_state(request))
+        self.assertEqual(
+            self.provider.get_granted_scope(request, '{"access_token": "token"}'),
+            ['profile', 'email'])
+        self.assertFalse(self.provider.check_application_state(
+            self.get_request(state=state, code='code')))
+
+    def test_state_is_bound_to_user(self):
+        state = self.redirect()
+        other = User.objects.create_user('other')
+        self.assertFalse(self.provider.check_application_state(
+            self.get_request(other, state=state)))
+        self.assertFalse(self.provider.check_application_state(
+            self.get_request(AnonymousUser(), state=state)))
+
+    def test_expired_or_tampered_state_is_rejected(self):
+        state = self.redirect()
+        self.assertFalse(self.provider.check_application_state(
+            self.get_request(state=state[:-1] + ('A' if state[-1] != 'A' else 'B'))))
+        with override_settings(CONNECTED_ACCOUNTS_STATE_MAX_AGE=-1):
+            self.assertFalse(self.provider.check_application_state(
+                self.get_request(state=state)))
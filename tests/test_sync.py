@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` profile sync.
+"""
+
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+import connected_accounts.providers  # noqa
+from connected_accounts.models import Account
+from connected_accounts.providers.facebook import FacebookProvider
+from connected_accounts.providers.twitter import TwitterProvider
+from connected_accounts.sync import ProfileSync
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+
+class TestProfileSync(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(username='admin')
+        for provider, uid in (('facebook', '1'), ('facebook', '2'), ('twitter', '3')):
+            Account.objects.create(
+                user=user, provider=provider, uid=uid, raw_token='{}',
+                oauth_token='token', extra_data={'name': 'old'})
+
+    @mock.patch.object(TwitterProvider, 'get_profile_data')
+    @mock.patch.object(FacebookProvider, 'get_profile_data')
+    def test_syncs_profiles_in_batches(self, facebook_profile, twitter_profile):
+        facebook_profile.return_value = {'name': 'new'}
+        progress = mock.Mock()
+
+        stats = ProfileSync(
+            provider_ids=['facebook'], workers=1, batch_size=1, progress=progress).run()
+
+        self.assertEqual((stats['processed'], stats['updated'], stats['failed']), (2, 2, 0))
+        self.assertEqual(progress.call_count, 2)
+        self.assertFalse(twitter_profile.called)
+        names = set(account.extra_data['name'] for account in Account.objects.all())
+        self.assertEqual(names, set(['new', 'old']))
+
+    @mock.patch.object(FacebookProvider, 'get_profile_data')
+    def test_counts_failures(self, get_profile_data):
+        get_profile_data.return_value = None
+
+        stats = ProfileSync(provider_ids=['facebook'], workers=1).run()
+
+        self.assertEqual((stats['updated'], stats['failed']), (0, 2))
+
+    @mock.patch.object(FacebookProvider, 'get_profile_data')
+    def test_records_sync_time_separately(self, get_profile_data):
+        get_profile_data.return_value = {'name': 'new'}
+        last_login = Account.objects.get(uid='1').last_login
+
+        ProfileSync(provider_ids=['facebook'], workers=1).run()
+
+        account = Account.objects.get(uid='1')
+        self.assertEqual(account.last_login, last_login)
+        self.assertIsNotNone(account.synced_at)
+        self.assertFalse(ProfileSync(older_than=timedelta(days=1)).get_queryset().exists())
+
+    @mock.patch.object(FacebookProvider, 'get_profile_data')
+    def test_invalidates_account_json(self, get_profile_data):
+        from connected_accounts.cache import get_account_json
+
+        get_profile_data.return_value = {'name': 'new'}
+        content, etag = get_account_json(Account.objects.get(uid='1'))
+
+        ProfileSync(provider_ids=['facebook'], workers=1).run()
+
+        self.assertNotEqual(get_account_json(Account.objects.get(uid='1'))[1], etag)
+
+    @mock.patch.object(FacebookProvider, 'get_profile_data')
+    def test_stops_workers_on_error(self, get_profile_data):
+        get_profile_data.return_value = {'name': 'new'}
+        threads = threading.active_count()
+
+        sync = ProfileSync(provider_ids=['facebook'], workers=2)
+        with mock.patch.object(sync, 'drain', side_effect=RuntimeError):
+            self.assertRaises(RuntimeError, sync.run)
+
+        self.assertEqual(threading.active_count(), threads)
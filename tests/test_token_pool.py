@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` token_pool module.
+"""
+
+from __future__ import unicode_literals
+
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from connected_accounts.providers.twitter import TwitterProvider
+from connected_accounts.token_pool import RequestTokenPool
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock
+
+CALLBACK = 'http://testserver/callback/twitter/'
+
+
+@override_settings(CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL=True,
+                   CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_SIZE=2)
+class TestRequestTokenPool(TestCase):
+
+    def setUp(self):
+        self.pool = RequestTokenPool()
+        self.provider = TwitterProvider()
+        self.tokens = iter('oauth_token=request{0}&oauth_token_secret=secret'.format(i)
+                           for i in range(10))
+        self.provider.fetch_request_token = mock.Mock(side_effect=lambda callback: next(self.tokens))
+
+    def test_refill_fills_pool(self):
+        self.pool.refill(self.provider, CALLBACK)
+        self.assertEqual(self.provider.fetch_request_token.call_count, 2)
+        self.provider.fetch_request_token.assert_called_with(CALLBACK)
+
+        with mock.patch.object(self.pool, 'start_refill') as start_refill:
+            self.assertEqual(self.pool.get(self.provider, CALLBACK),
+                             'oauth_token=request0&oauth_token_secret=secret')
+        start_refill.assert_called_once_with(self.provider, CALLBACK)
+        self.assertIsNone(self.pool.get(self.provider, 'http://testserver/other/'))
+
+    @override_settings(CONNECTED_ACCOUNTS_REQUEST_TOKEN_POOL_TTL=-1)
+    def test_expired_tokens_are_dropped(self):
+        self.pool.refill(self.provider, CALLBACK)
+        with mock.patch.object(self.pool, 'start_refill'):
+            self.assertIsNone(self.pool.get(self.provider, CALLBACK))
+
+    def test_redirect_uses_pool(self):
+        from connected_accounts.token_pool import request_token_pool
+
+        request = RequestFactory().get('/login/twitter/')
+        with mock.patch.object(request_token_pool, 'get', return_value='pooled') as get:
+            self.assertEqual(self.provider.get_request_token(request, '/callback/twitter/'), 'pooled')
+        get.assert_called_once_with(self.provider, CALLBACK)
+        self.assertFalse(self.provider.fetch_request_token.called)
+
+        with mock.patch.object(request_token_pool, 'get', return_value=None):
+            self.provider.get_request_token(request, '/callback/twitter/')
+        self.provider.fetch_request_token.assert_called_once_with(CALLBACK)
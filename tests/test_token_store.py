@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-connected
+------------
+
+Tests for `django-connected` token_store module.
+"""
+
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from connected_accounts.providers.twitter import TwitterProvider
+from connected_accounts.token_store import CacheRequestTokenStore
+
+RAW_TOKEN = 'oauth_token=request&oauth_token_secret=secret&oauth_callback_confirmed=true'
+
+
+class TestCacheRequestTokenStore(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.provider = TwitterProvider()
+        self.store = CacheRequestTokenStore()
+        self.user = User.objects.create_user('admin')
+
+    def get_request(self, user=None, **params):
+        request = RequestFactory().get('/callback/twitter/', params)
+        request.user = user or self.user
+        request.session = {}
+        return request
+
+    def test_consumed_once(self):
+        self.store.save(self.get_request(), self.provider, RAW_TOKEN, 'request')
+        self.assertEqual(self.store.consume(self.get_request(), self.provider, 'request'), RAW_TOKEN)
+        self.assertIsNone(self.store.consume(self.get_request(), self.provider, 'request'))
+
+    def test_bound_to_user(self):
+        self.store.save(self.get_request(), self.provider, RAW_TOKEN, 'request')
+        other = User.objects.create_user('other')
+        self.assertIsNone(self.store.consume(self.get_request(other), self.provider, 'request'))
+        # Someone else presenting the token doesn't use it up.
+        self.assertEqual(self.store.consume(self.get_request(), self.provider, 'request'), RAW_TOKEN)
+
+    @override_settings(CONNECTED_ACCOUNTS_REQUEST_TOKEN_TTL=-1)
+    def test_expires(self):
+        self.store.save(self.get_request(), self.provider, RAW_TOKEN, 'request')
+        self.assertIsNone(self.store.consume(self.get_request(), self.provider, 'request'))
+
+    @override_settings(
+        CONNECTED_ACCOUNTS_REQUEST_TOKEN_STORE='connected_accounts.token_store.CacheRequestTokenStore')
+    def test_redirect_and_callback_leave_session_alone(self):
+        request = self.get_request()
+        args = self.provider.get_request_token_redirect_args(request, '/callback/twitter/', RAW_TOKEN)
+        self.assertEqual(args['oauth_token'], 'request')
+        self.assertEqual(request.session, {})
+
+        kwargs = self.provider.get_access_token_kwargs(
+            self.get_request(oauth_token='request', oauth_verifier='verifier'))
+        self.assertEqual(kwargs['token'], RAW_TOKEN)
+        self.assertIsNone(self.provider.get_access_token_kwargs(
+            self.get_request(oauth_token='request', oauth_verifier='verifier')))